@@ -6,6 +6,8 @@ import base64
 from dotenv import load_dotenv
 from requests.models import Response
 
+from core.circuit_breaker import CircuitBreaker
+
 load_dotenv(".env")
 
 ARISTOTE_API_BASE_URL = os.environ["ARISTOTE_API_BASE_URL"]
@@ -15,7 +17,10 @@ ARISTOTE_END_USER_IDENTIFIER = os.environ["ARISTOTE_END_USER_IDENTIFIER"]
 
 BASE_URL = os.environ["BASE_URL"]
 
+ARISTOTE_API_TIMEOUT = 60
+
 token = None
+aristote_breaker = CircuitBreaker("aristote")
 
 
 def get_token():
@@ -30,30 +35,53 @@ def get_token():
                 f"{ARISTOTE_API_CLIENT_ID}:{ARISTOTE_API_CLIENT_SECRET}".encode()
             ).decode(),
         },
-        timeout=1000,
+        timeout=ARISTOTE_API_TIMEOUT,
     )
 
-    if token_response.status_code == 200:
-        global token
-        token = token_response.json()["access_token"]
-    else:
-        print(f"Couldn't get token. Error code : {token_response.status_code}")
-        return
+    if token_response.status_code != 200:
+        raise Exception(
+            f"Couldn't get token. Error code : {token_response.status_code}"
+        )
+
+    global token
+    token = token_response.json()["access_token"]
 
 
 def aristote_api(
-    uri: str, method: Literal["GET", "POST"], json: dict = None, headers: dict = {}
+    uri: str, method: Literal["GET", "POST"], json: dict = None, headers: dict = None
 ) -> Response:
-    get_token()
-    headers["Authorization"] = "Bearer " + token
-    if json:
-        headers["Content-Type"] = "application/json"
-
-    prefixed_uri = f"{ARISTOTE_API_BASE_URL}/v1/{uri}"
-    if method == "GET":
-        return requests.get(url=prefixed_uri, headers=headers)
-    elif method == "POST":
-        return requests.post(url=prefixed_uri, json=json, headers=headers)
+    # Fails fast with CircuitOpenError while Aristote is unavailable
+    aristote_breaker.before_call()
+    try:
+        get_token()
+        # Copy so that concurrent calls never share the same headers
+        headers = dict(headers or {})
+        headers["Authorization"] = "Bearer " + token
+        if json:
+            headers["Content-Type"] = "application/json"
+
+        prefixed_uri = f"{ARISTOTE_API_BASE_URL}/v1/{uri}"
+        if method == "GET":
+            response = requests.get(
+                url=prefixed_uri, headers=headers, timeout=ARISTOTE_API_TIMEOUT
+            )
+        elif method == "POST":
+            response = requests.post(
+                url=prefixed_uri,
+                json=json,
+                headers=headers,
+                timeout=ARISTOTE_API_TIMEOUT,
+            )
+    except Exception:
+        # Network errors, or Aristote couldn't deliver a token
+        aristote_breaker.record_failure()
+        raise
+
+    if response.status_code >= 500:
+        aristote_breaker.record_failure()
+    else:
+        aristote_breaker.record_success()
+    return response
 
 
 def request_enrichment(video_oid, language: str) -> str:
@@ -0,0 +1,93 @@
+import csv
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+CHANNELS_FILE = "channels.csv"
+
+
+def parse_duration(duration) -> int | None:
+    if duration is None or duration == "":
+        return None
+    if isinstance(duration, (int, float)):
+        return int(duration)
+
+    duration = str(duration).strip()
+    if duration.isdigit():
+        return int(duration)
+    if ":" in duration:
+        seconds = 0
+        for part in duration.split(":"):
+            seconds = seconds * 60 + int(float(part))
+        return seconds
+
+    # e.g. "1 h 5 m 30 s"
+    units = {"h": 3600, "m": 60, "s": 1}
+    matches = re.findall(r"(\d+)\s*([hms])", duration)
+    if not matches:
+        return None
+    return sum(int(value) * units[unit] for value, unit in matches)
+
+
+def get_channel_videos(msc, oid, info=None):
+    if info is None:
+        info = dict(channels=0, video_oids=[])
+    logger.debug("Making request on channels/content/ (parent_oid=%s)" % oid)
+    response = msc.api("channels/content/", params=dict(parent_oid=oid, content="cvlp"))
+    if response.get("channels"):
+        for item in response["channels"]:
+            info["channels"] += 1
+            get_channel_videos(msc, item["oid"], info)
+    if response.get("videos"):
+        for item in response["videos"]:
+            logger.debug("Media %s" % item["oid"])
+            info["video_oids"].append(
+                dict(
+                    oid=item["oid"],
+                    parent_oid=oid,
+                    type=item["type"],
+                    slug=item["slug"],
+                    add_date=item.get("add_date"),
+                    duration=parse_duration(item.get("duration")),
+                )
+            )
+    return info
+
+
+def get_channel_tree(msc, oid, oids=None) -> list:
+    if oids is None:
+        oids = []
+    oids.append(oid)
+    logger.debug("Making request on channels/content/ (parent_oid=%s)" % oid)
+    response = msc.api("channels/content/", params=dict(parent_oid=oid, content="c"))
+    if response.get("channels"):
+        for item in response["channels"]:
+            get_channel_tree(msc, item["oid"], oids)
+    return oids
+
+
+def get_channel_language(channel_oid: str) -> str:
+    with open(CHANNELS_FILE, mode="r", newline="") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            if row["channel_oid"] == channel_oid:
+                return row["language"]
+
+
+def get_enrichment_language(channel_oid: str) -> str | None:
+    channel_language = get_channel_language(channel_oid)
+    return (
+        channel_language
+        if channel_language != "" and channel_language != "fr/en"
+        else None
+    )
+
+
+def get_channel_priority(channel_oid: str) -> int:
+    with open(CHANNELS_FILE, mode="r", newline="") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            if row["channel_oid"] == channel_oid and row.get("priority"):
+                return int(row["priority"])
+    return 0
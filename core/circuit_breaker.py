@@ -0,0 +1,142 @@
+from collections import deque
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry after {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window_size: int = 20,
+        open_duration: float = 60,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.opened_at = None
+        self.half_open_calls = 0
+        # Outcomes of the last calls, True for a failure
+        self.outcomes = deque(maxlen=window_size)
+        self.calls_count = 0
+        self.failures_count = 0
+        self.rejected_count = 0
+        self.lock = threading.Lock()
+
+    def set_state(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name} : {self.state} -> {state}")
+        self.state = state
+        self.half_open_calls = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        else:
+            self.outcomes.clear()
+
+    def retry_after(self) -> float:
+        with self.lock:
+            if self.state != OPEN:
+                return 0
+            return max(0, self.opened_at + self.open_duration - time.monotonic())
+
+    def before_call(self):
+        with self.lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_duration - time.monotonic()
+                if remaining > 0:
+                    self.rejected_count += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.set_state(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected_count += 1
+                    raise CircuitOpenError(self.name, self.open_duration)
+                self.half_open_calls += 1
+
+            self.calls_count += 1
+
+    def record_success(self):
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.set_state(CLOSED)
+            self.outcomes.append(False)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures_count += 1
+            if self.state == HALF_OPEN:
+                self.set_state(OPEN)
+                return
+
+            self.outcomes.append(True)
+            if len(self.outcomes) >= self.minimum_calls:
+                failure_rate = sum(self.outcomes) / len(self.outcomes)
+                if failure_rate >= self.failure_rate_threshold:
+                    self.set_state(OPEN)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "state": self.state,
+                "calls": self.calls_count,
+                "failures": self.failures_count,
+                "rejected": self.rejected_count,
+            }
+
+
+def format_metrics(breakers: list[CircuitBreaker]) -> str:
+    lines = [
+        "# TYPE circuit_breaker_state gauge",
+        "# HELP circuit_breaker_state 0 closed, 1 half open, 2 open",
+    ]
+    metrics = {breaker.name: breaker.metrics() for breaker in breakers}
+    for name, values in metrics.items():
+        lines.append(
+            f'circuit_breaker_state{{name="{name}"}} {STATE_VALUES[values["state"]]}'
+        )
+    for counter in ["calls", "failures", "rejected"]:
+        lines.append(f"# TYPE circuit_breaker_{counter}_total counter")
+        for name, values in metrics.items():
+            lines.append(
+                f'circuit_breaker_{counter}_total{{name="{name}"}} {values[counter]}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def pause_on_open_circuit(error: CircuitOpenError):
+    logger.warning(f"{error}, pausing")
+    time.sleep(error.retry_after)
+
+
+def wait_for_circuits(breakers: list[CircuitBreaker]):
+    for breaker in breakers:
+        retry_after = breaker.retry_after()
+        if retry_after:
+            logger.warning(
+                f"{breaker.name} is unavailable, pausing for {retry_after:.0f}s"
+            )
+            time.sleep(retry_after)
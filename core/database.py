@@ -0,0 +1,776 @@
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ["PENDING", "TRANSCRIBED"]
+STUCK_CANDIDATE_STATUSES = ["PENDING", "FAILURE", "TRANSCRIBED"]
+# A handler holding a lock for longer than this is assumed to have crashed
+ENRICHMENT_LOCK_TIMEOUT = timedelta(minutes=30)
+# A submitter holding a queued video for longer than this is assumed to have crashed
+QUEUE_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def initiate_database(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+
+    # Lets status readers and webhook writers work concurrently
+    cursor.execute("PRAGMA journal_mode=WAL")
+
+    # Server workers start together, the first one migrates while the others
+    # wait for it and then find an up to date schema
+    cursor.execute("BEGIN IMMEDIATE")
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS enrichment_requests (
+        oid TEXT PRIMARY KEY,
+        enrichment_id TEXT,
+        request_sent_at DATETIME,
+        enrichment_notification_received_at DATETIME,
+        language TEXT,
+        status TEXT,
+        name TEXT,
+        parent_oid TEXT
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_enrichment_requests_status_sent_at
+    ON enrichment_requests (status, request_sent_at)
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS enrichment_queue (
+        oid TEXT PRIMARY KEY,
+        parent_oid TEXT,
+        name TEXT,
+        language TEXT,
+        priority INTEGER NOT NULL DEFAULT 0,
+        boost INTEGER NOT NULL DEFAULT 0,
+        published_at DATETIME,
+        enqueued_at DATETIME
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_enrichment_queue_order
+    ON enrichment_queue ((priority + boost) DESC, published_at DESC, enqueued_at)
+    """
+    )
+
+    add_column_if_missing(
+        conn, "enrichment_requests", "reconcile_attempts", "INTEGER NOT NULL DEFAULT 0"
+    )
+    add_column_if_missing(conn, "enrichment_requests", "next_check_at", "DATETIME")
+    add_column_if_missing(conn, "enrichment_requests", "media_duration", "INTEGER")
+    add_column_if_missing(conn, "enrichment_queue", "media_duration", "INTEGER")
+    add_column_if_missing(conn, "enrichment_requests", "latest_version_id", "TEXT")
+    add_column_if_missing(conn, "enrichment_requests", "version_language", "TEXT")
+    add_column_if_missing(conn, "enrichment_requests", "translate_to", "TEXT")
+    add_column_if_missing(conn, "enrichment_requests", "has_metadata", "INTEGER")
+    add_column_if_missing(
+        conn, "enrichment_queue", "attempts", "INTEGER NOT NULL DEFAULT 0"
+    )
+    add_column_if_missing(conn, "enrichment_queue", "next_attempt_at", "DATETIME")
+    add_column_if_missing(conn, "enrichment_queue", "last_error", "TEXT")
+    add_column_if_missing(conn, "enrichment_requests", "processing_time", "INTEGER")
+    add_column_if_missing(conn, "enrichment_queue", "submission_window", "TEXT")
+    add_column_if_missing(conn, "enrichment_queue", "max_in_flight", "INTEGER")
+    add_column_if_missing(conn, "enrichment_queue", "claimed_at", "DATETIME")
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_enrichment_requests_status_has_metadata
+    ON enrichment_requests (status, has_metadata)
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_enrichment_requests_parent_oid_status
+    ON enrichment_requests (parent_oid, status)
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_enrichment_requests_sent_at_status
+    ON enrichment_requests (request_sent_at, status)
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS processed_events (
+        enrichment_id TEXT,
+        version_id TEXT,
+        status TEXT,
+        processed_at DATETIME,
+        PRIMARY KEY (enrichment_id, version_id, status)
+    )
+    """
+    )
+
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS enrichment_locks (
+        enrichment_id TEXT PRIMARY KEY,
+        locked_at DATETIME
+    )
+    """
+    )
+
+    conn.commit()
+
+
+def add_column_if_missing(
+    conn: sqlite3.Connection, table: str, column: str, definition: str
+):
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    # Committed by initiate_database, along with the rest of the schema
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def get_all_requests(conn: sqlite3.Connection) -> tuple:
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM enrichment_requests")
+    column_names = [description[0] for description in cursor.description]
+    return column_names, cursor.fetchall()
+
+
+def count_requests_by_status(conn: sqlite3.Connection) -> dict:
+    cursor = conn.cursor()
+    cursor.execute("SELECT status, COUNT(*) FROM enrichment_requests GROUP BY status")
+    return dict(cursor.fetchall())
+
+
+def count_requests_by_channel(conn: sqlite3.Connection) -> dict:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT parent_oid, status, COUNT(*) FROM enrichment_requests
+        GROUP BY parent_oid, status
+        """
+    )
+    counts = {}
+    for parent_oid, status, count in cursor.fetchall():
+        counts.setdefault(parent_oid, {})[status] = count
+    return counts
+
+
+def count_requests_by_day(conn: sqlite3.Connection, since: datetime) -> dict:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT date(request_sent_at), status, COUNT(*) FROM enrichment_requests
+        WHERE request_sent_at >= ?
+        GROUP BY date(request_sent_at), status
+        """,
+        (format_datetime(since),),
+    )
+    counts = {}
+    for day, status, count in cursor.fetchall():
+        counts.setdefault(day, {})[status] = count
+    return counts
+
+
+def get_in_flight_sent_at(conn: sqlite3.Connection) -> list[datetime]:
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" for _ in IN_FLIGHT_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT request_sent_at FROM enrichment_requests
+        WHERE status IN ({placeholders}) AND request_sent_at IS NOT NULL
+        """,
+        IN_FLIGHT_STATUSES,
+    )
+    return [datetime.fromisoformat(row[0]) for row in cursor.fetchall()]
+
+
+def get_oid_by_enrichment_id(
+    conn: sqlite3.Connection, enrichment_id: str
+) -> str | None:
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT oid FROM enrichment_requests WHERE enrichment_id = ?", (enrichment_id,)
+    )
+    row = cursor.fetchone()
+
+    if row:
+        return row[0]
+    return None
+
+
+def get_enrichment_id_by_oid(conn: sqlite3.Connection, oid: str) -> str | None:
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT enrichment_id FROM enrichment_requests WHERE oid = ?", (oid,)
+    )
+    row = cursor.fetchone()
+
+    if row:
+        return row[0]
+    return None
+
+
+def get_status_by_oid(conn: sqlite3.Connection, oid: str) -> str | None:
+    cursor = conn.cursor()
+    cursor.execute("SELECT status FROM enrichment_requests WHERE oid = ?", (oid,))
+    row = cursor.fetchone()
+
+    if row:
+        return row[0]
+    return None
+
+
+def get_request_sent_at_by_oid(conn: sqlite3.Connection, oid: str) -> str | None:
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT request_sent_at FROM enrichment_requests WHERE oid = ?", (oid,)
+    )
+    row = cursor.fetchone()
+
+    if row:
+        return row[0]
+    return None
+
+
+def get_successful_requests(conn: sqlite3.Connection):
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        SELECT * FROM enrichment_requests
+        WHERE status = 'SUCCESS'
+        """
+    )
+
+    rows = cursor.fetchall()
+    result = [dict(row) for row in rows]
+
+    return result
+
+
+def oid_exists(conn: sqlite3.Connection, oid: str) -> bool:
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM enrichment_requests WHERE oid = ?", (oid,))
+
+    row = cursor.fetchone()
+
+    if row:
+        return True
+    return False
+
+
+def add_line(
+    conn: sqlite3.Connection,
+    oid: str,
+    enrichment_id: str,
+    language: str,
+    name: str,
+    parent_oid: str,
+    media_duration: int = None,
+):
+    cursor = conn.cursor()
+
+    request_sent_at = format_datetime(datetime.now())
+    status = "PENDING"
+
+    cursor.execute(
+        """
+        INSERT INTO enrichment_requests (oid, enrichment_id, request_sent_at, language, status, name, parent_oid, media_duration)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+        (
+            oid,
+            enrichment_id,
+            request_sent_at,
+            language,
+            status,
+            name,
+            parent_oid,
+            media_duration,
+        ),
+    )
+
+    conn.commit()
+    logger.debug(f"Enrichment request with oid: {oid} has been added.")
+
+
+def delete_line(conn: sqlite3.Connection, oid: str):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        DELETE FROM enrichment_requests WHERE oid = ?
+        """,
+        (oid,),
+    )
+
+    conn.commit()
+
+    logger.debug(f"Enrichment request with oid: {oid} has been deleted.")
+
+
+def update_status_by_oid(conn: sqlite3.Connection, oid: str, status: str):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET status = ?
+        WHERE oid = ?
+    """,
+        (status, oid),
+    )
+    conn.commit()
+
+
+def update_enrichment_notification_received_at(
+    conn: sqlite3.Connection, enrichment_id: str
+):
+    cursor = conn.cursor()
+
+    enrichment_notification_received_at = format_datetime(datetime.now())
+
+    # Only the first notification measures the processing time, later ones
+    # follow translation or quiz requests
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET enrichment_notification_received_at = ?,
+        processing_time = COALESCE(
+            processing_time,
+            CAST((julianday(?) - julianday(request_sent_at)) * 86400 AS INTEGER)
+        )
+        WHERE enrichment_id = ?
+    """,
+        (
+            enrichment_notification_received_at,
+            enrichment_notification_received_at,
+            enrichment_id,
+        ),
+    )
+    conn.commit()
+
+
+def mark_request_sent(conn: sqlite3.Connection, oid: str):
+    # A new version has been requested, it holds a slot and is checked again
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET request_sent_at = ?, reconcile_attempts = 0, next_check_at = NULL
+        WHERE oid = ?
+    """,
+        (format_datetime(datetime.now()), oid),
+    )
+    conn.commit()
+
+
+def update_language_by_oid(conn: sqlite3.Connection, oid: str, language: str):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET language = ?
+        WHERE oid = ?
+    """,
+        (language, oid),
+    )
+    conn.commit()
+
+
+def update_enrichment_version_by_oid(
+    conn: sqlite3.Connection, oid: str, enrichment_version: dict
+):
+    if "enrichmentVersionMetadata" in enrichment_version:
+        has_metadata = enrichment_version["enrichmentVersionMetadata"] is not None
+    else:
+        has_metadata = None
+
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET latest_version_id = ?, version_language = ?, translate_to = ?, has_metadata = ?
+        WHERE oid = ?
+    """,
+        (
+            enrichment_version["id"],
+            enrichment_version.get("language"),
+            enrichment_version.get("translateTo"),
+            has_metadata,
+            oid,
+        ),
+    )
+    conn.commit()
+
+
+def get_quiz_candidates(conn: sqlite3.Connection, parent_oids: list = None) -> dict:
+    # Requests whose latest version is known to have metadata can be skipped
+    cursor = conn.cursor()
+    if parent_oids is None:
+        cursor.execute(
+            """
+            SELECT oid, enrichment_id FROM enrichment_requests
+            WHERE status = 'SUCCESS' AND (has_metadata IS NULL OR has_metadata = 0)
+            """
+        )
+    else:
+        placeholders = ", ".join("?" for _ in parent_oids)
+        cursor.execute(
+            f"""
+            SELECT oid, enrichment_id FROM enrichment_requests
+            WHERE parent_oid IN ({placeholders})
+            AND status = 'SUCCESS' AND (has_metadata IS NULL OR has_metadata = 0)
+            """,
+            list(parent_oids),
+        )
+    return dict(cursor.fetchall())
+
+
+def count_in_flight(conn: sqlite3.Connection, since: datetime) -> int:
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" for _ in IN_FLIGHT_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT COUNT(*) FROM enrichment_requests
+        WHERE status IN ({placeholders}) AND request_sent_at >= ?
+        """,
+        (*IN_FLIGHT_STATUSES, format_datetime(since)),
+    )
+    return cursor.fetchone()[0]
+
+
+def get_processing_times(
+    conn: sqlite3.Connection, since: datetime, max_sample: timedelta
+) -> list[tuple]:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT media_duration,
+        COALESCE(
+            processing_time,
+            (julianday(enrichment_notification_received_at) - julianday(request_sent_at)) * 86400
+        )
+        FROM enrichment_requests
+        WHERE status = 'SUCCESS'
+        AND request_sent_at >= ?
+        AND enrichment_notification_received_at IS NOT NULL
+        """,
+        (format_datetime(since),),
+    )
+    max_seconds = max_sample.total_seconds()
+    return [
+        (media_duration, processing_time)
+        for media_duration, processing_time in cursor.fetchall()
+        if processing_time is not None and 0 < processing_time <= max_seconds
+    ]
+
+
+def get_overdue_requests(
+    conn: sqlite3.Connection, sent_before: datetime, batch_size: int
+) -> list[dict]:
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+
+    placeholders = ", ".join("?" for _ in STUCK_CANDIDATE_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT oid, enrichment_id, status, name, parent_oid, media_duration, request_sent_at, reconcile_attempts
+        FROM enrichment_requests
+        WHERE status IN ({placeholders})
+        AND request_sent_at <= ?
+        AND (next_check_at IS NULL OR next_check_at <= ?)
+        ORDER BY request_sent_at
+        LIMIT ?
+        """,
+        (
+            *STUCK_CANDIDATE_STATUSES,
+            format_datetime(sent_before),
+            format_datetime(datetime.now()),
+            batch_size,
+        ),
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def schedule_next_check(
+    conn: sqlite3.Connection, oid: str, attempts: int, next_check_at: datetime
+):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_requests
+        SET reconcile_attempts = ?, next_check_at = ?
+        WHERE oid = ?
+    """,
+        (attempts, format_datetime(next_check_at), oid),
+    )
+    conn.commit()
+
+
+def enqueue_video(
+    conn: sqlite3.Connection,
+    oid: str,
+    parent_oid: str,
+    name: str,
+    language: str,
+    priority: int,
+    published_at: str,
+    media_duration: int = None,
+    submission_window: str = None,
+    max_in_flight: int = None,
+):
+    cursor = conn.cursor()
+
+    enqueued_at = format_datetime(datetime.now())
+
+    cursor.execute(
+        """
+        INSERT INTO enrichment_queue (oid, parent_oid, name, language, priority, published_at, enqueued_at, media_duration, submission_window, max_in_flight)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(oid) DO UPDATE SET
+            parent_oid = excluded.parent_oid,
+            name = excluded.name,
+            language = excluded.language,
+            priority = excluded.priority,
+            published_at = excluded.published_at,
+            media_duration = excluded.media_duration,
+            submission_window = excluded.submission_window,
+            max_in_flight = excluded.max_in_flight
+    """,
+        (
+            oid,
+            parent_oid,
+            name,
+            language,
+            priority,
+            published_at,
+            enqueued_at,
+            media_duration,
+            submission_window,
+            max_in_flight,
+        ),
+    )
+
+    conn.commit()
+    logger.debug(f"OID : {oid} queued with priority {priority}")
+
+
+def get_queue_constraints(conn: sqlite3.Connection) -> list[tuple]:
+    now = datetime.now()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT DISTINCT submission_window, max_in_flight
+        FROM enrichment_queue
+        WHERE (next_attempt_at IS NULL OR next_attempt_at <= ?)
+        AND (claimed_at IS NULL OR claimed_at < ?)
+        """,
+        (format_datetime(now), format_datetime(now - QUEUE_CLAIM_TIMEOUT)),
+    )
+    return cursor.fetchall()
+
+
+def get_next_queued_video(
+    conn: sqlite3.Connection, constraints: list[tuple] = None
+) -> dict | None:
+    # Only videos queued with one of the given (window, max_in_flight) constraints
+    constraints_filter = ""
+    constraints_params = []
+    if constraints is not None:
+        if not constraints:
+            return None
+        constraints_filter = "AND ({})".format(
+            " OR ".join(
+                "(submission_window IS ? AND max_in_flight IS ?)" for _ in constraints
+            )
+        )
+        for submission_window, max_in_flight in constraints:
+            constraints_params += [submission_window, max_in_flight]
+
+    now = datetime.now()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT oid, parent_oid, name, language, media_duration, attempts
+        FROM enrichment_queue
+        WHERE (next_attempt_at IS NULL OR next_attempt_at <= ?)
+        AND (claimed_at IS NULL OR claimed_at < ?)
+        {constraints_filter}
+        ORDER BY (priority + boost) DESC, published_at DESC, enqueued_at
+        LIMIT 1
+        """,
+        (
+            format_datetime(now),
+            format_datetime(now - QUEUE_CLAIM_TIMEOUT),
+            *constraints_params,
+        ),
+    )
+    row = cursor.fetchone()
+
+    if row:
+        return dict(
+            zip(
+                ["oid", "parent_oid", "name", "language", "media_duration", "attempts"],
+                row,
+            )
+        )
+    return None
+
+
+def claim_queued_video(conn: sqlite3.Connection, oid: str) -> bool:
+    now = datetime.now()
+    cursor = conn.cursor()
+    # Only one of the processes draining the queue gets to submit the video
+    cursor.execute(
+        """
+        UPDATE enrichment_queue SET claimed_at = ?
+        WHERE oid = ? AND (claimed_at IS NULL OR claimed_at < ?)
+        """,
+        (format_datetime(now), oid, format_datetime(now - QUEUE_CLAIM_TIMEOUT)),
+    )
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def release_queued_video(conn: sqlite3.Connection, oid: str):
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE enrichment_queue SET claimed_at = NULL WHERE oid = ?", (oid,)
+    )
+    conn.commit()
+
+
+def get_queued_videos(conn: sqlite3.Connection, top: int = None) -> tuple:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT oid, parent_oid, name, language, priority, boost, priority + boost AS effective_priority, published_at, enqueued_at, submission_window, max_in_flight, attempts, next_attempt_at, last_error
+        FROM enrichment_queue
+        ORDER BY (priority + boost) DESC, published_at DESC, enqueued_at
+        LIMIT ?
+        """,
+        (top if top else -1,),
+    )
+    column_names = [description[0] for description in cursor.description]
+    return column_names, cursor.fetchall()
+
+
+def count_queued_videos(conn: sqlite3.Connection) -> int:
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM enrichment_queue")
+    return cursor.fetchone()[0]
+
+
+def boost_queued_video(conn: sqlite3.Connection, oid: str, boost: int) -> bool:
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE enrichment_queue SET boost = ? WHERE oid = ?",
+        (boost, oid),
+    )
+    conn.commit()
+    return cursor.rowcount > 0
+
+
+def dequeue_video(conn: sqlite3.Connection, oid: str):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM enrichment_queue WHERE oid = ?", (oid,))
+    conn.commit()
+
+
+def schedule_submission_retry(
+    conn: sqlite3.Connection,
+    oid: str,
+    attempts: int,
+    next_attempt_at: datetime,
+    error: str,
+):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        UPDATE enrichment_queue
+        SET attempts = ?, next_attempt_at = ?, last_error = ?, claimed_at = NULL
+        WHERE oid = ?
+    """,
+        (attempts, format_datetime(next_attempt_at), error, oid),
+    )
+    conn.commit()
+
+
+def is_event_processed(
+    conn: sqlite3.Connection, enrichment_id: str, version_id: str, status: str
+) -> bool:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT 1 FROM processed_events
+        WHERE enrichment_id = ? AND version_id = ? AND status = ?
+        """,
+        (enrichment_id, version_id, status),
+    )
+
+    if cursor.fetchone():
+        return True
+    return False
+
+
+def mark_event_processed(
+    conn: sqlite3.Connection, enrichment_id: str, version_id: str, status: str
+):
+    cursor = conn.cursor()
+
+    processed_at = format_datetime(datetime.now())
+
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO processed_events (enrichment_id, version_id, status, processed_at)
+        VALUES (?, ?, ?, ?)
+    """,
+        (enrichment_id, version_id, status, processed_at),
+    )
+    conn.commit()
+
+
+def acquire_enrichment_lock(conn: sqlite3.Connection, enrichment_id: str) -> bool:
+    cursor = conn.cursor()
+
+    now = datetime.now()
+
+    cursor.execute(
+        "DELETE FROM enrichment_locks WHERE enrichment_id = ? AND locked_at < ?",
+        (enrichment_id, format_datetime(now - ENRICHMENT_LOCK_TIMEOUT)),
+    )
+    cursor.execute(
+        "INSERT OR IGNORE INTO enrichment_locks (enrichment_id, locked_at) VALUES (?, ?)",
+        (enrichment_id, format_datetime(now)),
+    )
+    conn.commit()
+
+    return cursor.rowcount == 1
+
+
+def release_enrichment_lock(conn: sqlite3.Connection, enrichment_id: str):
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM enrichment_locks WHERE enrichment_id = ?", (enrichment_id,)
+    )
+    conn.commit()
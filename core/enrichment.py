@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+import logging
+import sqlite3
+from typing import TYPE_CHECKING, Callable
+
+from core.aristote import (
+    get_enrichment_version,
+    get_transcript,
+    request_new_enrichment,
+)
+from core.database import (
+    acquire_enrichment_lock,
+    get_oid_by_enrichment_id,
+    is_event_processed,
+    mark_event_processed,
+    mark_request_sent,
+    release_enrichment_lock,
+    update_enrichment_version_by_oid,
+    update_language_by_oid,
+    update_status_by_oid,
+)
+
+if TYPE_CHECKING:
+    from ms_client.client import MediaServerClient
+
+logger = logging.getLogger(__name__)
+
+ARISTOTE_MARKER = "aristote_generated"
+# Seconds after which a notification for a locked enrichment can be delivered again
+ENRICHMENT_LOCK_RETRY_AFTER = 30
+
+
+class EnrichmentLockedError(Exception):
+    def __init__(self, enrichment_id: str):
+        super().__init__(f"Enrichment : {enrichment_id} is already being processed")
+        self.enrichment_id = enrichment_id
+        self.retry_after = ENRICHMENT_LOCK_RETRY_AFTER
+
+
+@contextmanager
+def enrichment_lock(conn: sqlite3.Connection, enrichment_id: str):
+    if not acquire_enrichment_lock(conn, enrichment_id):
+        raise EnrichmentLockedError(enrichment_id)
+    try:
+        yield
+    finally:
+        release_enrichment_lock(conn, enrichment_id)
+
+
+def get_media_best_resource_url(msc: "MediaServerClient", oid) -> str:
+    resources = msc.api("medias/resources-list/", params=dict(oid=oid))["resources"]
+    resources.sort(key=lambda a: a["file_size"])
+    if not resources:
+        logger.debug("Media has no resources.")
+        return
+    best_quality = None
+    for r in resources:
+        if r["format"] != "m3u8":
+            best_quality = r
+            break
+    if not best_quality:
+        logger.warning("No resource file can be downloaded for video %s!" % (oid,))
+        logger.warning("Resources: %s" % resources)
+        raise Exception("Could not download any resource from list: %s." % resources)
+
+    logger.debug("Smallest file for video %s: %s" % (oid, best_quality["file"]))
+
+    if best_quality["format"] not in ("youtube", "embed"):
+        url_resource = msc.api(
+            "download/",
+            method="get",
+            params=dict(oid=oid, url=best_quality["file"], redirect="no"),
+        )["url"]
+        return url_resource
+    else:
+        return None
+
+
+def handle_enrichment(
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    oid: str,
+    enrichment_id: str,
+    enrichment_version_id: str,
+    status,
+):
+    if status == "SUCCESS":
+        if oid:
+            enrichment_version = get_enrichment_version(
+                enrichment_id, enrichment_version_id
+            )
+            # Raised errors leave the event unprocessed, so that it is handled again
+            if enrichment_version is None:
+                raise Exception(
+                    f"Enrichment : {enrichment_id} | Version {enrichment_version_id} not found"
+                )
+            language = enrichment_version["transcript"]["language"]
+            translate_to = enrichment_version["translateTo"]
+            update_enrichment_version_by_oid(conn, oid, enrichment_version)
+
+            if translate_to:
+                logger.debug(f"Enrichment translated to {translate_to}")
+            else:
+                logger.debug("Requesting enrichment translation")
+                if language is not None and language != "":
+                    if request_new_enrichment(enrichment_id, language) is None:
+                        raise Exception(
+                            f"Enrichment : {enrichment_id} | Translation refused by Aristote"
+                        )
+                    update_status_by_oid(conn=conn, oid=oid, status="TRANSCRIBED")
+                    update_language_by_oid(conn=conn, oid=oid, language=language)
+                    mark_request_sent(conn, oid)
+                else:
+                    update_status_by_oid(
+                        conn=conn, oid=oid, status="TRANSCRIBED_NO_LANGUAGE"
+                    )
+                return
+            transcript = get_transcript(enrichment_id, enrichment_version_id, language)
+            if transcript is None:
+                raise Exception(
+                    f"Enrichment : {enrichment_id} | Transcript in {language} not found"
+                )
+            subtitles_get_response = msc.api(
+                "/subtitles", method="get", params={"oid": oid}
+            )
+
+            subs = subtitles_get_response["subtitles"]
+
+            for sub in subs:
+                if str(sub["title"]).startswith(ARISTOTE_MARKER):
+                    logger.debug("Deleting found Aristote subtitle")
+                    sub_id = sub["id"]
+                    subtitles_delete_response = msc.api(
+                        "/subtitles/delete",
+                        method="post",
+                        data={"id": sub_id},
+                    )
+                    logger.debug(subtitles_delete_response["message"])
+
+            logger.debug(f"Submitting subtitles in {language}")
+            subtitles_add_response = msc.api(
+                "/subtitles/add",
+                method="post",
+                data={
+                    "oid": oid,
+                    "lang": language,
+                    "validated": "yes",
+                    "title": f"{ARISTOTE_MARKER}_{language}",
+                },
+                files={
+                    "file": (
+                        f"{ARISTOTE_MARKER}_{oid}_{language}.srt",
+                        transcript,
+                        "text/plain",
+                    )
+                },
+            )
+            logger.debug(subtitles_add_response["message"])
+
+            if translate_to:
+                translated_transcript = get_transcript(
+                    enrichment_id, enrichment_version_id, translate_to
+                )
+                if translated_transcript is None:
+                    raise Exception(
+                        f"Enrichment : {enrichment_id} | Transcript in {translate_to} not found"
+                    )
+                logger.debug(f"Submitting translated subtitles in {translate_to}")
+                translated_subtitles_add_response = msc.api(
+                    "/subtitles/add",
+                    method="post",
+                    data={
+                        "oid": oid,
+                        "lang": translate_to,
+                        "validated": "yes",
+                        "title": f"{ARISTOTE_MARKER}_{translate_to}",
+                    },
+                    files={
+                        "file": (
+                            f"{ARISTOTE_MARKER}_{oid}_{translate_to}.srt",
+                            translated_transcript,
+                            "text/plain",
+                        )
+                    },
+                )
+                logger.debug(translated_subtitles_add_response["message"])
+
+            # Only once subtitles are published, a failure above leaves the
+            # request TRANSCRIBED for the reconciler
+            update_status_by_oid(conn=conn, oid=oid, status="SUCCESS")
+        return
+    elif status == "FAILURE":
+        update_status_by_oid(conn=conn, oid=oid, status="FAILURE")
+        return
+
+
+def process_enrichment_event(
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    oid: str,
+    enrichment_id: str,
+    enrichment_version_id: str,
+    status,
+    before_handle: Callable[[], None] = None,
+) -> bool:
+    # Duplicates stop here, before_handle (e.g. contacting Nudgis) and the OID
+    # lookup (when oid is None) only run for an event handled under the lock
+    if is_event_processed(conn, enrichment_id, enrichment_version_id, status):
+        logger.info(f"Enrichment : {enrichment_id} | {status} already processed")
+        return False
+
+    # Raises EnrichmentLockedError while another handler processes it
+    with enrichment_lock(conn, enrichment_id):
+        # The event may have been processed while waiting for the lock
+        if is_event_processed(conn, enrichment_id, enrichment_version_id, status):
+            return False
+
+        if before_handle:
+            before_handle()
+        if oid is None:
+            oid = get_oid_by_enrichment_id(conn=conn, enrichment_id=enrichment_id)
+        logger.info(f"OID : {oid} | Enrichment : {enrichment_id} | {status}")
+
+        handle_enrichment(conn, msc, oid, enrichment_id, enrichment_version_id, status)
+        mark_event_processed(conn, enrichment_id, enrichment_version_id, status)
+
+    return True
@@ -0,0 +1,26 @@
+from ms_client.client import MediaServerClient, MediaServerRequestError
+
+from core.circuit_breaker import CircuitBreaker
+
+nudgis_breaker = CircuitBreaker("nudgis")
+
+
+class NudgisClient(MediaServerClient):
+    def api(self, *args, **kwargs):
+        nudgis_breaker.before_call()
+        try:
+            response = super().api(*args, **kwargs)
+        except MediaServerRequestError as error:
+            # Client errors (e.g. unknown OID) mean the server is answering
+            status_code = getattr(error, "status_code", None)
+            if status_code is None or status_code >= 500:
+                nudgis_breaker.record_failure()
+            else:
+                nudgis_breaker.record_success()
+            raise
+        except Exception:
+            nudgis_breaker.record_failure()
+            raise
+
+        nudgis_breaker.record_success()
+        return response
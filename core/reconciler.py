@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import logging
+import sqlite3
+import time
+
+from core.aristote import (
+    aristote_breaker,
+    get_enrichment,
+    get_latest_enrichment_version,
+)
+from core.channels import get_channel_priority, get_enrichment_language
+from core.circuit_breaker import CircuitOpenError, wait_for_circuits
+from core.database import (
+    enqueue_video,
+    get_overdue_requests,
+    get_request_sent_at_by_oid,
+    schedule_next_check,
+)
+from core.enrichment import process_enrichment_event
+from core.nudgis import NudgisClient, nudgis_breaker
+from core.stuck import is_stuck
+from core.submissions import compute_priority, drain_queue, format_time_window
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_BASE_DELAY = timedelta(minutes=5)
+RECONCILE_MAX_DELAY = timedelta(hours=6)
+
+
+def postpone_check(conn: sqlite3.Connection, request: dict):
+    attempts = request["reconcile_attempts"]
+    delay = min(RECONCILE_BASE_DELAY * 2**attempts, RECONCILE_MAX_DELAY)
+    schedule_next_check(conn, request["oid"], attempts + 1, datetime.now() + delay)
+
+
+def resubmit_request(
+    conn: sqlite3.Connection,
+    request: dict,
+    max_in_flight: int = None,
+    window: tuple = None,
+):
+    # Submitted by the queue drain, which retries failed submissions
+    enqueue_video(
+        conn,
+        request["oid"],
+        request["parent_oid"],
+        request["name"],
+        get_enrichment_language(request["parent_oid"]),
+        compute_priority(None, get_channel_priority(request["parent_oid"]), False),
+        None,
+        request["media_duration"],
+        format_time_window(window),
+        max_in_flight,
+    )
+    postpone_check(conn, request)
+
+
+def reconcile_request(
+    conn: sqlite3.Connection,
+    msc: NudgisClient,
+    request: dict,
+    enrichment: dict,
+    max_in_flight: int = None,
+    window: tuple = None,
+):
+    oid = request["oid"]
+    enrichment_id = request["enrichment_id"]
+
+    if enrichment is None:
+        logger.warning(f"OID : {oid} | Enrichment : {enrichment_id} not found")
+        postpone_check(conn, request)
+        return
+
+    status = enrichment["status"]
+
+    if is_stuck(
+        conn, enrichment, request["request_sent_at"], request["media_duration"]
+    ):
+        logger.info(
+            f"OID : {oid} | Enrichment : {enrichment_id} is stuck, resubmitting"
+        )
+        resubmit_request(conn, request, max_in_flight, window)
+        return
+
+    if status == "SUCCESS":
+        logger.info(
+            f"OID : {oid} | Enrichment : {enrichment_id} has been treated but missed webhook"
+        )
+        latest_enrichment_version = get_latest_enrichment_version(enrichment_id)
+        if latest_enrichment_version is None:
+            logger.warning(
+                f"OID : {oid} | Enrichment : {enrichment_id} latest version not found"
+            )
+        else:
+            process_enrichment_event(
+                conn, msc, oid, enrichment_id, latest_enrichment_version["id"], status
+            )
+            if get_request_sent_at_by_oid(conn, oid) != request["request_sent_at"]:
+                # A translation has just been requested, its checks start over
+                return
+
+    # Still processing
+    postpone_check(conn, request)
+
+
+def reconcile_once(
+    conn: sqlite3.Connection,
+    msc: NudgisClient,
+    executor: ThreadPoolExecutor,
+    overdue_after: timedelta,
+    batch_size: int,
+    max_in_flight: int = None,
+    window: tuple = None,
+) -> int:
+    overdue_requests = get_overdue_requests(
+        conn, datetime.now() - overdue_after, batch_size
+    )
+
+    futures = {}
+    for request in overdue_requests:
+        if request["enrichment_id"] is None:
+            logger.info(f"OID : {request['oid']} has no enrichment, resubmitting")
+            resubmit_request(conn, request, max_in_flight, window)
+            continue
+        futures[executor.submit(get_enrichment, request["enrichment_id"])] = request
+
+    # Aristote is polled in parallel, database writes stay on this thread
+    for future in as_completed(futures):
+        request = futures[future]
+        try:
+            reconcile_request(
+                conn, msc, request, future.result(), max_in_flight, window
+            )
+        except CircuitOpenError:
+            # Checked again on the next iteration, once resumed
+            continue
+        except Exception as error:
+            logger.warning(
+                f"OID : {request['oid']} | Enrichment : {request['enrichment_id']} could not be reconciled : {error}"
+            )
+            postpone_check(conn, request)
+
+    return len(overdue_requests)
+
+
+def reconcile(
+    conn: sqlite3.Connection,
+    msc: NudgisClient,
+    overdue_after: timedelta,
+    workers: int = 8,
+    interval: int = 60,
+    batch_size: int = 100,
+    once: bool = False,
+    max_in_flight: int = None,
+    window: tuple = None,
+):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            wait_for_circuits([aristote_breaker, nudgis_breaker])
+            checked = reconcile_once(
+                conn, msc, executor, overdue_after, batch_size, max_in_flight, window
+            )
+            logger.info(f"Reconciled {checked} overdue enrichment requests")
+
+            # Also submit queued videos and due retries, as long as their slots are free
+            drain_queue(conn, wait=False)
+
+            if once:
+                return
+            if checked < batch_size:
+                time.sleep(interval)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import sqlite3
+import threading
+
+from core.database import (
+    count_queued_videos,
+    count_requests_by_channel,
+    count_requests_by_day,
+    count_requests_by_status,
+    format_datetime,
+    get_in_flight_sent_at,
+)
+
+STATUS_HISTORY = timedelta(days=30)
+BACKLOG_PERCENTILES = [50, 90, 99]
+
+status_cache = {"summary": None, "computed_at": None}
+status_cache_lock = threading.Lock()
+
+
+def percentile(values: list, percent: float):
+    ordered = sorted(values)
+    # Nearest-rank method
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def compute_status_summary(conn: sqlite3.Connection) -> dict:
+    now = datetime.now()
+
+    by_status = count_requests_by_status(conn)
+    backlog_ages = [
+        (now - sent_at).total_seconds() for sent_at in get_in_flight_sent_at(conn)
+    ]
+
+    backlog = {"count": len(backlog_ages)}
+    for percent in BACKLOG_PERCENTILES:
+        backlog[f"p{percent}_age_seconds"] = (
+            round(percentile(backlog_ages, percent)) if backlog_ages else None
+        )
+    backlog["max_age_seconds"] = round(max(backlog_ages)) if backlog_ages else None
+
+    return {
+        "generated_at": format_datetime(now),
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_channel": count_requests_by_channel(conn),
+        "by_day": count_requests_by_day(conn, now - STATUS_HISTORY),
+        "backlog": backlog,
+        "queued": count_queued_videos(conn),
+    }
+
+
+def get_status_summary(conn: sqlite3.Connection, ttl: timedelta = None) -> dict:
+    # Dashboards polling every few seconds are served from the cache
+    with status_cache_lock:
+        computed_at = status_cache["computed_at"]
+        if ttl and computed_at and datetime.now() - computed_at < ttl:
+            return status_cache["summary"]
+
+        status_cache["summary"] = compute_status_summary(conn)
+        status_cache["computed_at"] = datetime.now()
+        return status_cache["summary"]
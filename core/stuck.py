@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import sqlite3
+
+from core.database import get_processing_times
+from core.status import percentile
+
+# Used until enough enrichments have been processed to learn from
+DEFAULT_STUCK_TIMEOUT = timedelta(hours=2)
+MIN_STUCK_TIMEOUT = timedelta(minutes=30)
+STUCK_TIMEOUT_PERCENTILE = 95
+STUCK_TIMEOUT_FACTOR = 2
+STUCK_TIMEOUT_MIN_SAMPLES = 20
+STUCK_TIMEOUT_HISTORY = timedelta(days=90)
+STUCK_TIMEOUT_CACHE_TTL = timedelta(minutes=10)
+# Longer samples, recorded before processing_time, are re-requested enrichments
+STUCK_TIMEOUT_MAX_SAMPLE = timedelta(days=2)
+# Upper bounds (in seconds) of the media duration buckets
+DURATION_BUCKETS = [15 * 60, 45 * 60, 90 * 60, None]
+
+
+def get_duration_bucket(media_duration: int | None) -> int | None:
+    if media_duration is None:
+        return None
+    for bucket in DURATION_BUCKETS:
+        if bucket is None or media_duration <= bucket:
+            return bucket
+
+
+def compute_timeout_stats(processing_times: list) -> dict:
+    stats = {"samples": len(processing_times)}
+    for percent in [50, 90, STUCK_TIMEOUT_PERCENTILE]:
+        stats[f"p{percent}"] = (
+            timedelta(seconds=round(percentile(processing_times, percent)))
+            if processing_times
+            else None
+        )
+
+    if len(processing_times) < STUCK_TIMEOUT_MIN_SAMPLES:
+        stats["timeout"] = None
+    else:
+        stats["timeout"] = max(
+            MIN_STUCK_TIMEOUT,
+            stats[f"p{STUCK_TIMEOUT_PERCENTILE}"] * STUCK_TIMEOUT_FACTOR,
+        )
+    return stats
+
+
+def estimate_stuck_timeouts(conn: sqlite3.Connection) -> dict:
+    processing_times = get_processing_times(
+        conn, datetime.now() - STUCK_TIMEOUT_HISTORY, STUCK_TIMEOUT_MAX_SAMPLE
+    )
+
+    estimates = {
+        "all": compute_timeout_stats(
+            [processing_time for _, processing_time in processing_times]
+        )
+    }
+    for bucket in DURATION_BUCKETS:
+        estimates[bucket] = compute_timeout_stats(
+            [
+                processing_time
+                for media_duration, processing_time in processing_times
+                if media_duration is not None
+                and get_duration_bucket(media_duration) == bucket
+            ]
+        )
+    return estimates
+
+
+stuck_timeouts_cache = {"estimates": None, "computed_at": None}
+
+
+def get_stuck_timeout(
+    conn: sqlite3.Connection, media_duration: int | None
+) -> timedelta:
+    computed_at = stuck_timeouts_cache["computed_at"]
+    if computed_at is None or datetime.now() - computed_at > STUCK_TIMEOUT_CACHE_TTL:
+        stuck_timeouts_cache["estimates"] = estimate_stuck_timeouts(conn)
+        stuck_timeouts_cache["computed_at"] = datetime.now()
+
+    estimates = stuck_timeouts_cache["estimates"]
+    if media_duration is None:
+        return resolve_stuck_timeout(estimates, "all")
+    return resolve_stuck_timeout(estimates, get_duration_bucket(media_duration))
+
+
+def resolve_stuck_timeout(estimates: dict, bucket) -> timedelta:
+    # Fall back on all durations, then on the default, when samples are missing
+    return (
+        estimates[bucket]["timeout"]
+        or estimates["all"]["timeout"]
+        or DEFAULT_STUCK_TIMEOUT
+    )
+
+
+def is_stuck(
+    conn: sqlite3.Connection,
+    enrichment: dict,
+    request_sent_at: str | None,
+    media_duration: int = None,
+) -> bool:
+    status = enrichment["status"]
+    # Timeouts are learned from the time between the request and its
+    # notification, so they are compared with the time since the request
+    ancient_request = True
+    if request_sent_at:
+        timeout = get_stuck_timeout(conn, media_duration)
+        sent_at = datetime.fromisoformat(request_sent_at)
+        ancient_request = sent_at < datetime.now() - timeout
+
+    return status == "FAILURE" or (status == "UPLOADING_MEDIA" and ancient_request)
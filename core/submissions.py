@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+import logging
+import random
+import sqlite3
+import time
+
+from core.aristote import request_enrichment
+from core.circuit_breaker import CircuitOpenError, pause_on_open_circuit
+from core.database import (
+    STUCK_CANDIDATE_STATUSES,
+    add_line,
+    claim_queued_video,
+    count_in_flight,
+    delete_line,
+    dequeue_video,
+    get_next_queued_video,
+    get_queue_constraints,
+    get_status_by_oid,
+    oid_exists,
+    release_queued_video,
+    schedule_submission_retry,
+    update_status_by_oid,
+)
+
+logger = logging.getLogger(__name__)
+
+# Requests older than this are considered lost and no longer hold a slot
+IN_FLIGHT_MAX_AGE = timedelta(hours=24)
+
+# Videos published recently always go before any backfill work
+FRESH_CONTENT_AGE = timedelta(days=7)
+FRESH_CONTENT_PRIORITY = 1000
+BACKFILL_PRIORITY = -1000
+
+SUBMISSION_MAX_ATTEMPTS = 8
+SUBMISSION_BASE_DELAY = timedelta(minutes=1)
+SUBMISSION_MAX_DELAY = timedelta(hours=1)
+
+
+def parse_time_window(window: str) -> tuple:
+    start, end = window.split("-")
+    return (
+        datetime.strptime(start.strip(), "%H:%M").time(),
+        datetime.strptime(end.strip(), "%H:%M").time(),
+    )
+
+
+def format_time_window(window: tuple) -> str | None:
+    if window is None:
+        return None
+    start, end = window
+    return f"{start:%H:%M}-{end:%H:%M}"
+
+
+def in_time_window(window: tuple, now: datetime) -> bool:
+    start, end = window
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    # Window spanning midnight, e.g. 22:00-06:00
+    return current >= start or current < end
+
+
+def has_submission_slot(
+    conn: sqlite3.Connection, max_in_flight: int = None, window: tuple = None
+) -> bool:
+    if window and not in_time_window(window, datetime.now()):
+        logger.debug("Outside of submission window")
+        return False
+
+    if max_in_flight is None:
+        return True
+
+    in_flight = count_in_flight(conn, datetime.now() - IN_FLIGHT_MAX_AGE)
+    if in_flight < max_in_flight:
+        return True
+
+    logger.debug(f"{in_flight} enrichments in flight (max {max_in_flight})")
+    return False
+
+
+def wait_for_submission_slot(
+    conn: sqlite3.Connection,
+    max_in_flight: int = None,
+    window: tuple = None,
+    poll_interval: int = 60,
+):
+    while not has_submission_slot(conn, max_in_flight, window):
+        time.sleep(poll_interval)
+
+
+def compute_priority(published_at: str, channel_priority: int, backfill: bool) -> int:
+    priority = channel_priority
+
+    fresh = False
+    if published_at:
+        try:
+            fresh = datetime.fromisoformat(published_at).replace(tzinfo=None) >= (
+                datetime.now() - FRESH_CONTENT_AGE
+            )
+        except ValueError:
+            logger.warning(f"Unexpected publication date : {published_at}")
+
+    if fresh:
+        priority += FRESH_CONTENT_PRIORITY
+    elif backfill:
+        priority += BACKFILL_PRIORITY
+
+    return priority
+
+
+def record_submission_failure(conn: sqlite3.Connection, video: dict, error: str):
+    oid = video["oid"]
+    attempts = video["attempts"] + 1
+
+    if attempts < SUBMISSION_MAX_ATTEMPTS:
+        logger.warning(f"OID : {oid} | Submission failed ({error}), will retry")
+        delay = min(SUBMISSION_BASE_DELAY * 2 ** (attempts - 1), SUBMISSION_MAX_DELAY)
+        # Jitter so that videos failed together are not all retried together
+        delay *= random.uniform(0.5, 1)
+        schedule_submission_retry(conn, oid, attempts, datetime.now() + delay, error)
+        return
+
+    logger.warning(f"OID : {oid} | Submission failed {attempts} times, giving up")
+    if not oid_exists(conn, oid):
+        add_line(
+            conn,
+            oid,
+            None,
+            video["language"],
+            video["name"],
+            video["parent_oid"],
+            video["media_duration"],
+        )
+        update_status_by_oid(conn, oid, "SUBMISSION_FAILED")
+    elif get_status_by_oid(conn, oid) in STUCK_CANDIDATE_STATUSES:
+        # Otherwise the reconciler would queue it again, with no attempts.
+        # A video already enriched keeps its previous enrichment.
+        update_status_by_oid(conn, oid, "SUBMISSION_FAILED")
+    dequeue_video(conn, oid)
+
+
+def submit_video(conn: sqlite3.Connection, video: dict) -> bool:
+    oid = video["oid"]
+    try:
+        enrichment_id = request_enrichment(oid, language=video["language"])
+        error = "Enrichment request refused by Aristote"
+    except CircuitOpenError:
+        raise
+    except Exception as exception:
+        enrichment_id = None
+        error = str(exception)
+
+    if enrichment_id is None:
+        record_submission_failure(conn, video, error)
+        return False
+
+    if oid_exists(conn, oid):
+        delete_line(conn, oid)
+
+    add_line(
+        conn,
+        oid,
+        enrichment_id,
+        video["language"],
+        video["name"],
+        video["parent_oid"],
+        video["media_duration"],
+    )
+    dequeue_video(conn, oid)
+    return True
+
+
+def claim_next_video(conn: sqlite3.Connection) -> dict | None:
+    # Each video is throttled by the constraints of the run which queued it
+    constraints = [
+        (submission_window, max_in_flight)
+        for submission_window, max_in_flight in get_queue_constraints(conn)
+        if has_submission_slot(
+            conn,
+            max_in_flight,
+            parse_time_window(submission_window) if submission_window else None,
+        )
+    ]
+
+    while True:
+        video = get_next_queued_video(conn, constraints)
+        if video is None or claim_queued_video(conn, video["oid"]):
+            return video
+
+
+def drain_queue(
+    conn: sqlite3.Connection,
+    limit: int = None,
+    max_in_flight: int = None,
+    window: tuple = None,
+    poll_interval: int = 60,
+    wait: bool = True,
+) -> int:
+    submitted_count = 0
+
+    while limit is None or submitted_count < limit:
+        video = claim_next_video(conn)
+        if video is None:
+            # Only videos queued with the constraints of this run are waited for
+            if not wait or not get_next_queued_video(
+                conn, [(format_time_window(window), max_in_flight)]
+            ):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            submitted = submit_video(conn, video)
+        except CircuitOpenError as error:
+            # The video stays in the queue and is submitted once resumed
+            release_queued_video(conn, video["oid"])
+            pause_on_open_circuit(error)
+            continue
+        if submitted:
+            submitted_count += 1
+
+    return submitted_count
@@ -10,21 +10,70 @@ mkdir examples
 mv "this file" mediaserver-client/examples
 """
 import csv
-from datetime import datetime, timedelta
+import json
+from datetime import timedelta
 import os
 import sqlite3
+import sys
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from ms_client.client import MediaServerClient
 import argparse
 import logging
 
-from aristote import (
-    request_enrichment,
+from core.aristote import (
+    aristote_breaker,
     get_enrichment,
     get_latest_enrichment_version,
     request_new_enrichment,
 )
-from ubicast import handle_enrichment, logger
+from core.channels import (
+    get_channel_priority,
+    get_channel_tree,
+    get_channel_videos,
+    get_enrichment_language,
+)
+from core.circuit_breaker import (
+    CircuitOpenError,
+    pause_on_open_circuit,
+    wait_for_circuits,
+)
+from core.database import (
+    STUCK_CANDIDATE_STATUSES,
+    boost_queued_video,
+    count_queued_videos,
+    enqueue_video,
+    get_all_requests,
+    get_enrichment_id_by_oid,
+    get_queued_videos,
+    get_quiz_candidates,
+    get_request_sent_at_by_oid,
+    get_status_by_oid,
+    initiate_database,
+    mark_request_sent,
+    oid_exists,
+    update_enrichment_version_by_oid,
+    update_status_by_oid,
+)
+from core.enrichment import process_enrichment_event
+from core.status import get_status_summary
+from core.stuck import (
+    STUCK_TIMEOUT_PERCENTILE,
+    estimate_stuck_timeouts,
+    is_stuck,
+    resolve_stuck_timeout,
+)
+from core.submissions import (
+    compute_priority,
+    drain_queue,
+    format_time_window,
+    parse_time_window,
+    wait_for_submission_slot,
+)
+
+if TYPE_CHECKING:
+    from ms_client.client import MediaServerClient
+
+logger = logging.getLogger(__name__)
 
 load_dotenv(".env")
 
@@ -32,255 +81,302 @@ DATABASE_URL = os.environ["DATABASE_URL"]
 CONFIG_FILE = os.environ["CONFIG_FILE"]
 
 
-def get_channel_videos(msc, oid, info=None):
-    if info is None:
-        info = dict(channels=0, video_oids=[])
-    logger.debug("Making request on channels/content/ (parent_oid=%s)" % oid)
-    response = msc.api("channels/content/", params=dict(parent_oid=oid, content="cvlp"))
-    if response.get("channels"):
-        for item in response["channels"]:
-            info["channels"] += 1
-            get_channel_videos(msc, item["oid"], info)
-    if response.get("videos"):
-        for item in response["videos"]:
-            logger.debug("Media %s" % item["oid"])
-            info["video_oids"].append(
-                dict(
-                    oid=item["oid"],
-                    parent_oid=oid,
-                    type=item["type"],
-                    slug=item["slug"],
-                )
-            )
-    return info
-
-
-def print_table():
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM enrichment_requests")
-    rows = cursor.fetchall()
-
-    column_names = [description[0] for description in cursor.description]
+def print_table(conn: sqlite3.Connection):
+    column_names, rows = get_all_requests(conn)
     print(column_names)
 
     for row in rows:
         print(row)
 
 
-def initiate_database():
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-    CREATE TABLE IF NOT EXISTS enrichment_requests (
-        oid TEXT PRIMARY KEY,
-        enrichment_id TEXT,
-        request_sent_at DATETIME,
-        enrichment_notification_received_at DATETIME,
-        language TEXT,
-        status TEXT,
-        name TEXT,
-        parent_oid TEXT
-    )
-    """
-    )
-
-    conn.commit()
+def wait_for_services():
+    # Imported here, like the client, to keep ms_client out of other commands
+    from core.nudgis import nudgis_breaker
 
+    wait_for_circuits([aristote_breaker, nudgis_breaker])
 
-def update_status_by_oid(oid: str, status: str):
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        UPDATE enrichment_requests
-        SET status = ?
-        WHERE oid = ?
-    """,
-        (status, oid),
-    )
-    conn.commit()
 
+def queue_command(conn: sqlite3.Connection, args):
+    if args.queue_action == "boost":
+        if boost_queued_video(conn, args.oid, args.boost):
+            print(f"{args.oid} boosted by {args.boost}")
+        else:
+            print(f"{args.oid} is not in the queue")
+        return
 
-def get_status_by_oid(oid: str) -> str | None:
-    cursor = conn.cursor()
-    cursor.execute("SELECT status FROM enrichment_requests WHERE oid = ?", (oid,))
-    row = cursor.fetchone()
+    column_names, rows = get_queued_videos(conn, args.top)
+    print(f"Queued videos : {count_queued_videos(conn)}")
+    print(column_names)
 
-    if row:
-        return row[0]
-    return None
+    for row in rows:
+        print(row)
 
 
-def get_enrichment_id_by_oid(oid: str) -> str | None:
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT enrichment_id FROM enrichment_requests WHERE oid = ?", (oid,)
+def timeouts_command(conn: sqlite3.Connection):
+    estimates = estimate_stuck_timeouts(conn)
+    print(
+        [
+            "media_duration",
+            "samples",
+            "p50",
+            "p90",
+            f"p{STUCK_TIMEOUT_PERCENTILE}",
+            "timeout",
+        ]
     )
-    row = cursor.fetchone()
-
-    if row:
-        return row[0]
-    return None
-
-
-def add_line(oid: str, enrichment_id: str, language: str, name: str, parent_oid: str):
-    cursor = conn.cursor()
-
-    request_sent_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    status = "PENDING"
 
-    cursor.execute(
-        """
-        INSERT INTO enrichment_requests (oid, enrichment_id, request_sent_at, language, status, name, parent_oid)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """,
-        (oid, enrichment_id, request_sent_at, language, status, name, parent_oid),
-    )
+    lower_bound = 0
+    for bucket, stats in estimates.items():
+        if bucket == "all":
+            label = "all"
+        elif bucket is None:
+            label = f"> {lower_bound // 60} min"
+        else:
+            label = f"{lower_bound // 60}-{bucket // 60} min"
+            lower_bound = bucket
+        print(
+            (
+                label,
+                stats["samples"],
+                str(stats["p50"]),
+                str(stats["p90"]),
+                str(stats[f"p{STUCK_TIMEOUT_PERCENTILE}"]),
+                str(resolve_stuck_timeout(estimates, bucket)),
+            )
+        )
 
-    conn.commit()
-    logger.debug(f"Enrichment request with oid: {oid} has been added.")
 
+def request_quiz(
+    conn: sqlite3.Connection,
+    report: dict,
+    oid: str,
+    enrichment_id: str,
+    max_in_flight: int = None,
+    window: tuple = None,
+    poll_interval: int = 60,
+):
+    latest_enrichment_version = get_latest_enrichment_version(enrichment_id)
+    if latest_enrichment_version is None:
+        logger.warning(
+            f"OID : {oid} | Enrichment : {enrichment_id} latest version not found"
+        )
+        return
+    update_enrichment_version_by_oid(conn, oid, latest_enrichment_version)
+    if latest_enrichment_version["enrichmentVersionMetadata"] is not None:
+        return
+
+    wait_for_submission_slot(conn, max_in_flight, window, poll_interval)
+    if request_new_enrichment(enrichment_id, latest_enrichment_version["language"]):
+        update_status_by_oid(conn, oid, "PENDING")
+        mark_request_sent(conn, oid)
+        report["requests"] += 1
+        logger.debug(
+            f"OID : {oid} | Enrichment : {enrichment_id} Requested quiz generation"
+        )
+        report["enriched_videos"].append({"oid": oid, "enrichmentId": enrichment_id})
+    else:
+        logger.warning(
+            f"OID : {oid} | Enrichment : {enrichment_id} Quiz generation refused by Aristote"
+        )
+
+
+def request_quizzes(
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    report: dict,
+    channel_oid: str,
+    limit: int = None,
+    max_in_flight: int = None,
+    window: tuple = None,
+    poll_interval: int = 60,
+):
+    # Videos are not listed, only those known to lack metadata are checked
+    quiz_candidates = get_quiz_candidates(conn, get_channel_tree(msc, channel_oid))
+    logger.info(f"Channel {channel_oid} : {len(quiz_candidates)} quiz candidates")
 
-def delete_line(oid: str):
-    cursor = conn.cursor()
+    for oid, enrichment_id in quiz_candidates.items():
+        if limit and report["requests"] >= limit:
+            break
 
-    cursor.execute(
-        """
-        DELETE FROM enrichment_requests WHERE oid = ?
-        """,
-        (oid,),
-    )
+        wait_for_services()
 
-    conn.commit()
+        try:
+            request_quiz(
+                conn, report, oid, enrichment_id, max_in_flight, window, poll_interval
+            )
+        except CircuitOpenError:
+            raise
+        except Exception as error:
+            # Counted by the circuit breakers, still a candidate on the next run
+            logger.warning(
+                f"OID : {oid} | Enrichment : {enrichment_id} quiz could not be requested : {error}"
+            )
 
-    logger.debug(f"Enrichment request with oid: {oid} has been deleted.")
 
+def process_video(
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    report: dict,
+    video: dict,
+    update: str = None,
+    max_in_flight: int = None,
+    window: tuple = None,
+):
+    oid = video["oid"]
+    parent_oid = video["parent_oid"]
+    name = video["slug"]
+
+    oid_already_exists = oid_exists(conn, oid)
+
+    stuck = False
+    if update == "stuck" and oid_already_exists:
+        known_status = get_status_by_oid(conn, oid)
+        enrichment_id = get_enrichment_id_by_oid(conn, oid)
+        if known_status == "SUBMISSION_FAILED" or (
+            known_status in STUCK_CANDIDATE_STATUSES and enrichment_id is None
+        ):
+            logger.debug(f"OID : {oid} has no enrichment")
+            stuck = True
+            report["stuck_videos"].append(
+                {"oid": oid, "enrichmentId": None, "status": known_status}
+            )
+        elif known_status in STUCK_CANDIDATE_STATUSES:
+            enrichment = get_enrichment(enrichment_id)
+            if enrichment is None:
+                logger.warning(f"OID : {oid} | Enrichment : {enrichment_id} not found")
+                return
+            status = enrichment["status"]
+
+            if is_stuck(
+                conn,
+                enrichment,
+                get_request_sent_at_by_oid(conn, oid),
+                video["duration"],
+            ):
+                logger.debug(f"OID : {oid} | Enrichment : {enrichment_id} is stuck")
+                stuck = True
+                report["stuck_videos"].append(
+                    {"oid": oid, "enrichmentId": enrichment_id, "status": status}
+                )
+            elif status == "SUCCESS":
+                logger.debug(
+                    f"OID : {oid} | Enrichment : {enrichment_id} has been treated but missed webhook"
+                )
+                latest_enrichment_version = get_latest_enrichment_version(enrichment_id)
+                if latest_enrichment_version is None:
+                    logger.warning(
+                        f"OID : {oid} | Enrichment : {enrichment_id} latest version not found"
+                    )
+                    return
+                process_enrichment_event(
+                    conn,
+                    msc,
+                    oid,
+                    enrichment_id,
+                    latest_enrichment_version["id"],
+                    status,
+                )
+                report["stuck_videos"].append(
+                    {"oid": oid, "enrichmentId": enrichment_id, "status": status}
+                )
 
-def oid_exists(oid):
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM enrichment_requests WHERE oid = ?", (oid,))
+    force_update = update == "all" or (update == "stuck" and stuck)
 
-    row = cursor.fetchone()
+    if not oid_already_exists or force_update:
+        channel_language = get_enrichment_language(video["parent_oid"])
 
-    if row:
-        return True
-    return False
+        ignore_video = False
 
+        if oid_already_exists:
+            known_status = get_status_by_oid(conn, oid)
+            ignore_video = known_status in [
+                "TRANSCRIBED_NO_LANGUAGE",
+                "NOT_DOWNLOADABLE",
+            ]
 
-def get_channel_language(channel_oid: str) -> str:
-    with open("channels.csv", mode="r", newline="") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["channel_oid"] == channel_oid:
-                return row["language"]
+        if not ignore_video:
+            priority = compute_priority(
+                video["add_date"],
+                get_channel_priority(parent_oid),
+                backfill=oid_already_exists and update == "all",
+            )
+            enqueue_video(
+                conn,
+                oid,
+                parent_oid,
+                name,
+                channel_language,
+                priority,
+                video["add_date"],
+                video["duration"],
+                format_time_window(window),
+                max_in_flight,
+            )
+            report["queued"] += 1
 
 
 def worklow(
-    msc: MediaServerClient, channel_oid: str, update: str = None, limit: int = None
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    report: dict,
+    channel_oid: str,
+    update: str = None,
+    limit: int = None,
+    max_in_flight: int = None,
+    window: tuple = None,
+    poll_interval: int = 60,
 ):
-    global videos_count
-    global enrichment_requests_count
-    global stuck_videos
-    global enriched_videos
+    if update == "quiz":
+        request_quizzes(
+            conn,
+            msc,
+            report,
+            channel_oid,
+            limit,
+            max_in_flight,
+            window,
+            poll_interval,
+        )
+        return
 
     info = get_channel_videos(msc, channel_oid)
-    videos_count += len(info["video_oids"])
 
     for video in info["video_oids"]:
-        if limit and enrichment_requests_count >= limit:
+        # Queued videos are kept for later runs, which may not be throttled
+        if limit and report["requests"] + report["queued"] >= limit:
             break
 
-        oid = video["oid"]
-        parent_oid = video["parent_oid"]
-        name = video["slug"]
+        wait_for_services()
 
-        oid_already_exists = oid_exists(oid)
+        try:
+            process_video(conn, msc, report, video, update, max_in_flight, window)
+        except CircuitOpenError:
+            raise
+        except Exception as error:
+            # Counted by the circuit breakers, the video is checked on the next run
+            logger.warning(f"OID : {video['oid']} could not be processed : {error}")
 
-        if update == "quiz" and oid_already_exists:
-            known_status = get_status_by_oid(oid)
-            if known_status == "SUCCESS":
-                enrichment_id = get_enrichment_id_by_oid(oid)
-                latest_enrichment_version = get_latest_enrichment_version(enrichment_id)
-                if latest_enrichment_version["enrichmentVersionMetadata"] is None:
-                    update_status_by_oid(oid, "PENDING")
-                    request_new_enrichment(
-                        enrichment_id, latest_enrichment_version["language"]
-                    )
-                    enrichment_requests_count += 1
-                    logger.debug(
-                        f"OID : {oid} | Enrichment : {enrichment_id} Requested quiz generation"
-                    )
-                    enriched_videos.append({"oid": oid, "enrichmentId": enrichment_id})
-
-        stuck = False
-        if update == "stuck" and oid_already_exists:
-            known_status = get_status_by_oid(oid)
-            if known_status in ["PENDING", "FAILURE", "TRANSCRIBED"]:
-                enrichment_id = get_enrichment_id_by_oid(oid)
-                enrichment = get_enrichment(enrichment_id)
-                status = enrichment["status"]
-                upload_started_at = enrichment["uploadStartedAt"]
-                ancient_upload = True
-                if upload_started_at:
-                    upload_started_at = datetime.fromisoformat(
-                        enrichment["uploadStartedAt"]
-                    )
-                    now = datetime.now(upload_started_at.tzinfo)
-                    now_minus_delta = now - timedelta(hours=2)
-                    ancient_upload = upload_started_at < now_minus_delta
-
-                if status == "FAILURE" or (
-                    status == "UPLOADING_MEDIA" and ancient_upload
-                ):
-                    logger.debug(f"OID : {oid} | Enrichment : {enrichment_id} is stuck")
-                    stuck = True
-                    stuck_videos.append(
-                        {"oid": oid, "enrichmentId": enrichment_id, "status": status}
-                    )
-                elif status == "SUCCESS":
-                    logger.debug(
-                        f"OID : {oid} | Enrichment : {enrichment_id} has been treated but missed webhook"
-                    )
-                    latest_enrichment_version = get_latest_enrichment_version(
-                        enrichment_id
-                    )["id"]
-                    handle_enrichment(
-                        conn, msc, oid, enrichment_id, latest_enrichment_version, status
-                    )
-                    stuck_videos.append(
-                        {"oid": oid, "enrichmentId": enrichment_id, "status": status}
-                    )
-
-        force_update = update == "all" or (update == "stuck" and stuck)
-
-        if not oid_already_exists or force_update:
-            channel_language = get_channel_language(video["parent_oid"])
-            channel_language = (
-                channel_language
-                if channel_language != "" and channel_language != "fr/en"
-                else None
-            )
-
-            ignore_video = False
-
-            if oid_already_exists:
-                known_status = get_status_by_oid(oid)
-                ignore_video = known_status in [
-                    "TRANSCRIBED_NO_LANGUAGE",
-                    "NOT_DOWNLOADABLE",
-                ]
-
-            if not oid_already_exists or (
-                oid_already_exists and force_update and not ignore_video
-            ):
-                enrichment_id = request_enrichment(oid, language=channel_language)
-                enrichment_requests_count += 1
+    report["videos"] += len(info["video_oids"])
 
-            if oid_already_exists and force_update and not ignore_video:
-                delete_line(oid)
 
-            if not ignore_video:
-                add_line(oid, enrichment_id, channel_language, name, parent_oid)
+def run_workflow(
+    conn: sqlite3.Connection,
+    msc: "MediaServerClient",
+    report: dict,
+    channel_oid: str,
+    *args,
+):
+    while True:
+        try:
+            worklow(conn, msc, report, channel_oid, *args)
+            return
+        except CircuitOpenError as error:
+            # Crawl the channel again once resumed, queueing videos is idempotent
+            pause_on_open_circuit(error)
+        except Exception as error:
+            # Counted by the circuit breakers, the channel is crawled on the next run
+            logger.error(f"Channel {channel_oid} could not be crawled : {error}")
+            return
 
 
 if __name__ == "__main__":
@@ -297,48 +393,193 @@ if __name__ == "__main__":
     parser.add_argument(
         "--limit", type=str, help="Specify a limit for enrichment requests"
     )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum number of enrichments (PENDING or TRANSCRIBED) allowed in flight, new requests are submitted as they complete",
+    )
+    parser.add_argument(
+        "--window",
+        type=str,
+        help="Only submit enrichment requests within this daily time window, e.g. '22:00-06:00'",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        default=60,
+        help="Seconds to wait between two checks for a free submission slot",
+    )
     parser.add_argument("--debug", action="store_true", help="Debug mode")
+
+    subparsers = parser.add_subparsers(dest="command")
+    queue_parser = subparsers.add_parser(
+        "queue", help="Inspect or reprioritize the enrichment queue"
+    )
+    queue_parser.set_defaults(top=None)
+    queue_subparsers = queue_parser.add_subparsers(dest="queue_action")
+    queue_list_parser = queue_subparsers.add_parser(
+        "list", help="List queued videos by priority"
+    )
+    queue_list_parser.add_argument(
+        "--top", type=int, help="Only show the first queued videos"
+    )
+    queue_boost_parser = queue_subparsers.add_parser(
+        "boost", help="Manually boost the priority of a queued video"
+    )
+    queue_boost_parser.add_argument("oid", type=str, help="Video OID")
+    queue_boost_parser.add_argument(
+        "boost", type=int, help="Priority added to the computed one"
+    )
+    reconcile_parser = subparsers.add_parser(
+        "reconcile",
+        help="Continuously check overdue enrichment requests for missed webhooks",
+    )
+    reconcile_parser.add_argument(
+        "--overdue-after",
+        type=int,
+        default=30,
+        help="Minutes after which a request without notification is checked",
+    )
+    reconcile_parser.add_argument(
+        "--workers", type=int, default=8, help="Number of parallel Aristote polls"
+    )
+    reconcile_parser.add_argument(
+        "--interval",
+        type=int,
+        default=60,
+        help="Seconds to wait when there is no more overdue request",
+    )
+    reconcile_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Maximum number of requests checked per iteration",
+    )
+    reconcile_parser.add_argument(
+        "--once", action="store_true", help="Run a single iteration and exit"
+    )
+    subparsers.add_parser(
+        "timeouts",
+        help="Show the stuck timeouts learned from past processing times",
+    )
+    subparsers.add_parser(
+        "status",
+        help="Show aggregate enrichment counts and backlog ages as JSON",
+    )
     args = parser.parse_args()
 
     channel_oid = args.channel
     update = args.update
     csv_file = args.csv
     limit = int(args.limit) if args.limit else None
+    max_in_flight = args.max_in_flight
+    window = parse_time_window(args.window) if args.window else None
+    poll_interval = args.poll_interval
     if args.debug:
         logger.setLevel(logging.DEBUG)
+        logging.getLogger("core").setLevel(logging.DEBUG)
+
+    conn = sqlite3.connect(DATABASE_URL)
+    initiate_database(conn)
+
+    if args.command == "queue":
+        queue_command(conn, args)
+        conn.close()
+        sys.exit(0)
+
+    if args.command == "timeouts":
+        timeouts_command(conn)
+        conn.close()
+        sys.exit(0)
+
+    if args.command == "status":
+        print(json.dumps(get_status_summary(conn), indent=2))
+        conn.close()
+        sys.exit(0)
 
     logger.info(f"Channel: {channel_oid}")
     logger.info(f"Update: {update}")
     logger.info(f"CSV File: {csv_file}")
     logger.info(f"Limit : {limit}")
+    logger.info(f"Max in flight : {max_in_flight}")
+    logger.info(f"Window : {args.window}")
+
+    # Only imported by commands talking to Nudgis
+    from core.nudgis import NudgisClient, nudgis_breaker
 
-    msc = MediaServerClient(CONFIG_FILE)
+    msc = NudgisClient(CONFIG_FILE)
     msc.check_server()
 
-    conn = sqlite3.connect(DATABASE_URL)
-    initiate_database()
+    if args.command == "reconcile":
+        from core.reconciler import reconcile
+
+        try:
+            reconcile(
+                conn,
+                msc,
+                timedelta(minutes=args.overdue_after),
+                args.workers,
+                args.interval,
+                args.batch_size,
+                args.once,
+                max_in_flight,
+                window,
+            )
+        except KeyboardInterrupt:
+            logger.info("Stopping reconciliation")
+        conn.close()
+        sys.exit(0)
 
-    videos_count = 0
-    enrichment_requests_count = 0
-    stuck_videos = []
-    enriched_videos = []
+    report = dict(videos=0, requests=0, queued=0, stuck_videos=[], enriched_videos=[])
 
     if channel_oid:
-        worklow(msc, channel_oid, update, limit)
+        run_workflow(
+            conn,
+            msc,
+            report,
+            channel_oid,
+            update,
+            limit,
+            max_in_flight,
+            window,
+            poll_interval,
+        )
     elif csv_file:
         with open(csv_file, mode="r", newline="") as file:
             reader = csv.DictReader(file)
             for row in reader:
-                worklow(msc, row["channel_oid"], update, limit)
+                run_workflow(
+                    conn,
+                    msc,
+                    report,
+                    row["channel_oid"],
+                    update,
+                    limit,
+                    max_in_flight,
+                    window,
+                    poll_interval,
+                )
+
+    report["requests"] += drain_queue(
+        conn,
+        max(limit - report["requests"], 0) if limit else None,
+        max_in_flight,
+        window,
+        poll_interval,
+    )
 
-    logger.info(f"Total number of videos : {videos_count}")
+    logger.info(f"Total number of videos : {report['videos']}")
+    logger.info(f"Requested enrichments : {report['requests']}")
+    logger.info(f"Videos left in queue : {count_queued_videos(conn)}")
+    logger.info(f"Aristote circuit breaker : {aristote_breaker.metrics()}")
+    logger.info(f"Nudgis circuit breaker : {nudgis_breaker.metrics()}")
 
     if update == "stuck":
-        logger.info(f"Number of stuck videos : {len(stuck_videos)}")
-        logger.info(stuck_videos)
+        logger.info(f"Number of stuck videos : {len(report['stuck_videos'])}")
+        logger.info(report["stuck_videos"])
 
     if update == "quiz":
-        logger.info(f"Requested enrichment for {len(enriched_videos)} videos")
-        logger.info(enriched_videos)
+        logger.info(f"Requested enrichment for {len(report['enriched_videos'])} videos")
+        logger.info(report["enriched_videos"])
 
     conn.close()
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+import pytest
+
+# Read when the modules are imported, the values are never used by the tests
+for name, value in {
+    "ARISTOTE_API_BASE_URL": "http://aristote.test/api",
+    "ARISTOTE_API_CLIENT_ID": "client",
+    "ARISTOTE_API_CLIENT_SECRET": "secret",
+    "ARISTOTE_END_USER_IDENTIFIER": "tests",
+    "BASE_URL": "http://importer.test",
+    "DATABASE_URL": ":memory:",
+    "CONFIG_FILE": "config.json",
+    "ARISTOTE_PORTAL_BASE_URL": "http://portal.test",
+    "CSV_ENPOINT_USER": "admin",
+    "CSV_ENPOINT_PASSWORD": "admin",
+}.items():
+    os.environ.setdefault(name, value)
+
+from core.database import initiate_database  # noqa: E402
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    initiate_database(conn)
+    yield conn
+    conn.close()
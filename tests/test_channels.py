@@ -0,0 +1,22 @@
+import pytest
+
+from core.channels import parse_duration
+
+
+@pytest.mark.parametrize(
+    "duration, expected",
+    [
+        (None, None),
+        ("", None),
+        (90, 90),
+        (90.5, 90),
+        ("90", 90),
+        ("01:30", 90),
+        ("1:02:03", 3723),
+        ("1 h 5 m 30 s", 3930),
+        ("2m", 120),
+        ("unknown", None),
+    ],
+)
+def test_parse_duration(duration, expected):
+    assert parse_duration(duration) == expected
@@ -0,0 +1,111 @@
+import pytest
+
+from core import circuit_breaker
+from core.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    format_metrics,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def call(breaker: CircuitBreaker, failed: bool):
+    breaker.before_call()
+    if failed:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.minimum_calls):
+        call(breaker, failed=True)
+
+
+def test_stays_closed_below_minimum_calls():
+    breaker = CircuitBreaker("test", minimum_calls=10)
+    for _ in range(9):
+        call(breaker, failed=True)
+    assert breaker.state == CLOSED
+
+
+def test_stays_closed_below_failure_rate():
+    breaker = CircuitBreaker("test", minimum_calls=10, failure_rate_threshold=0.5)
+    for index in range(20):
+        call(breaker, failed=index % 3 == 0)
+    assert breaker.state == CLOSED
+
+
+def test_opens_at_failure_rate(clock):
+    breaker = CircuitBreaker("test", minimum_calls=10, failure_rate_threshold=0.5)
+    for index in range(10):
+        call(breaker, failed=index % 2 == 1)
+    assert breaker.state == OPEN
+
+
+def test_open_rejects_calls(clock):
+    breaker = CircuitBreaker("test", open_duration=60)
+    open_breaker(breaker)
+
+    clock[0] += 20
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(40)
+    assert breaker.retry_after() == pytest.approx(40)
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker("test", open_duration=60)
+    open_breaker(breaker)
+
+    clock[0] += 60
+    assert breaker.retry_after() == 0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker("test", open_duration=60)
+    open_breaker(breaker)
+
+    clock[0] += 60
+    call(breaker, failed=False)
+    assert breaker.state == CLOSED
+    # Failures before opening are forgotten
+    call(breaker, failed=True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_again(clock):
+    breaker = CircuitBreaker("test", open_duration=60)
+    open_breaker(breaker)
+
+    clock[0] += 60
+    call(breaker, failed=True)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(60)
+
+
+def test_format_metrics(clock):
+    closed = CircuitBreaker("closed")
+    call(closed, failed=False)
+    opened = CircuitBreaker("opened")
+    open_breaker(opened)
+
+    lines = format_metrics([closed, opened]).splitlines()
+    assert 'circuit_breaker_state{name="closed"} 0' in lines
+    assert 'circuit_breaker_state{name="opened"} 2' in lines
+    assert 'circuit_breaker_calls_total{name="closed"} 1' in lines
+    assert 'circuit_breaker_failures_total{name="opened"} 10' in lines
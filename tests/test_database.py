@@ -0,0 +1,90 @@
+from contextlib import closing
+import multiprocessing
+import sqlite3
+
+from core.database import (
+    add_line,
+    get_quiz_candidates,
+    initiate_database,
+    update_enrichment_version_by_oid,
+    update_status_by_oid,
+)
+
+# Schema before any migration
+LEGACY_SCHEMA = """
+CREATE TABLE enrichment_requests (
+    oid TEXT PRIMARY KEY,
+    enrichment_id TEXT,
+    request_sent_at DATETIME,
+    enrichment_notification_received_at DATETIME,
+    language TEXT,
+    status TEXT,
+    name TEXT,
+    parent_oid TEXT
+)
+"""
+
+
+def migrate(path, barrier, errors):
+    barrier.wait()
+    try:
+        with closing(sqlite3.connect(path)) as conn:
+            initiate_database(conn)
+    except Exception as error:
+        errors.put(str(error))
+
+
+def test_concurrent_migrations(tmp_path):
+    # Like server workers starting together on the first deployment
+    for trial in range(3):
+        path = str(tmp_path / f"aristote-{trial}.db")
+        with closing(sqlite3.connect(path)) as conn:
+            conn.execute(LEGACY_SCHEMA)
+            conn.commit()
+
+        barrier = multiprocessing.Barrier(3)
+        errors = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=migrate, args=(path, barrier, errors))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert errors.empty()
+        assert all(process.exitcode == 0 for process in processes)
+        with closing(sqlite3.connect(path)) as conn:
+            columns = [
+                row[1] for row in conn.execute("PRAGMA table_info(enrichment_requests)")
+            ]
+        assert "processing_time" in columns
+
+
+def successful(conn, oid, parent_oid, metadata=None, known=True):
+    add_line(conn, oid, f"e-{oid}", "fr", "name", parent_oid)
+    update_status_by_oid(conn, oid, "SUCCESS")
+    if known:
+        update_enrichment_version_by_oid(
+            conn, oid, {"id": "ver1", "enrichmentVersionMetadata": metadata}
+        )
+
+
+def test_quiz_candidates(conn):
+    successful(conn, "unknown", "c1", known=False)
+    successful(conn, "without_metadata", "c1")
+    successful(conn, "with_metadata", "c1", metadata={"title": "Quiz"})
+    successful(conn, "other_channel", "c2")
+    add_line(conn, "pending", "e-pending", "fr", "name", "c1")
+
+    assert get_quiz_candidates(conn) == {
+        "unknown": "e-unknown",
+        "without_metadata": "e-without_metadata",
+        "other_channel": "e-other_channel",
+    }
+    assert get_quiz_candidates(conn, ["c1"]) == {
+        "unknown": "e-unknown",
+        "without_metadata": "e-without_metadata",
+    }
+    assert get_quiz_candidates(conn, []) == {}
@@ -0,0 +1,180 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from core import enrichment
+from core.database import (
+    ENRICHMENT_LOCK_TIMEOUT,
+    acquire_enrichment_lock,
+    add_line,
+    format_datetime,
+    get_status_by_oid,
+    is_event_processed,
+    mark_event_processed,
+    update_status_by_oid,
+)
+from core.enrichment import EnrichmentLockedError, process_enrichment_event
+
+
+class FakeNudgis:
+    def __init__(self):
+        self.calls = []
+
+    def api(self, uri, method="get", params=None, data=None, files=None):
+        self.calls.append((uri, data))
+        if uri == "/subtitles":
+            return {"subtitles": []}
+        return {"message": "ok"}
+
+
+@pytest.fixture
+def aristote(monkeypatch):
+    calls = {"translations": 0, "translation_status": "OK", "transcripts": {}}
+
+    def get_enrichment_version(enrichment_id, version_id):
+        return {
+            "id": version_id,
+            "language": "fr",
+            "translateTo": calls.get("translate_to"),
+            "transcript": {"language": "fr"},
+            "enrichmentVersionMetadata": None,
+        }
+
+    def request_new_enrichment(enrichment_id, language=None):
+        calls["translations"] += 1
+        return calls["translation_status"]
+
+    def get_transcript(enrichment_id, version_id, language=None):
+        return calls["transcripts"].get(language)
+
+    monkeypatch.setattr(enrichment, "get_enrichment_version", get_enrichment_version)
+    monkeypatch.setattr(enrichment, "request_new_enrichment", request_new_enrichment)
+    monkeypatch.setattr(enrichment, "get_transcript", get_transcript)
+    return calls
+
+
+@pytest.fixture
+def pending(conn):
+    add_line(conn, "v1", "e1", "fr", "name", "c1")
+    return conn
+
+
+def test_refused_translation_is_handled_again(pending, aristote):
+    aristote["translation_status"] = None
+
+    with pytest.raises(Exception):
+        process_enrichment_event(pending, FakeNudgis(), "v1", "e1", "ver1", "SUCCESS")
+    assert not is_event_processed(pending, "e1", "ver1", "SUCCESS")
+    assert get_status_by_oid(pending, "v1") == "PENDING"
+
+    aristote["translation_status"] = "OK"
+    assert process_enrichment_event(
+        pending, FakeNudgis(), "v1", "e1", "ver1", "SUCCESS"
+    )
+    assert aristote["translations"] == 2
+    assert get_status_by_oid(pending, "v1") == "TRANSCRIBED"
+    assert is_event_processed(pending, "e1", "ver1", "SUCCESS")
+
+
+def test_missing_transcript_is_handled_again(pending, aristote):
+    update_status_by_oid(pending, "v1", "TRANSCRIBED")
+    aristote["translate_to"] = "en"
+    aristote["transcripts"] = {"fr": "1\n00:00:00,000 --> 00:00:01,000\nBonjour\n"}
+
+    with pytest.raises(Exception):
+        process_enrichment_event(pending, FakeNudgis(), "v1", "e1", "ver2", "SUCCESS")
+    assert not is_event_processed(pending, "e1", "ver2", "SUCCESS")
+    assert get_status_by_oid(pending, "v1") == "TRANSCRIBED"
+
+
+def test_translated_enrichment_publishes_subtitles(pending, aristote):
+    update_status_by_oid(pending, "v1", "TRANSCRIBED")
+    aristote["translate_to"] = "en"
+    aristote["transcripts"] = {"fr": "Bonjour", "en": "Hello"}
+    msc = FakeNudgis()
+
+    assert process_enrichment_event(pending, msc, "v1", "e1", "ver2", "SUCCESS")
+
+    added = [data["lang"] for uri, data in msc.calls if uri == "/subtitles/add"]
+    assert added == ["fr", "en"]
+    assert get_status_by_oid(pending, "v1") == "SUCCESS"
+    assert is_event_processed(pending, "e1", "ver2", "SUCCESS")
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        enrichment,
+        "handle_enrichment",
+        lambda conn, msc, oid, enrichment_id, version_id, status: events.append(
+            (oid, enrichment_id, version_id, status)
+        ),
+    )
+    return events
+
+
+def test_event_is_handled_once(pending, handled):
+    assert process_enrichment_event(pending, None, None, "e1", "ver1", "SUCCESS")
+    assert not process_enrichment_event(pending, None, "v1", "e1", "ver1", "SUCCESS")
+    # Another status or version of the same enrichment is a new event
+    assert process_enrichment_event(pending, None, "v1", "e1", "ver1", "FAILURE")
+    assert process_enrichment_event(pending, None, "v1", "e1", "ver2", "SUCCESS")
+
+    assert handled == [
+        ("v1", "e1", "ver1", "SUCCESS"),
+        ("v1", "e1", "ver1", "FAILURE"),
+        ("v1", "e1", "ver2", "SUCCESS"),
+    ]
+
+
+def test_locked_event_is_not_handled(pending, handled):
+    calls = []
+    acquire_enrichment_lock(pending, "e1")
+
+    with pytest.raises(EnrichmentLockedError):
+        process_enrichment_event(
+            pending, None, "v1", "e1", "ver1", "SUCCESS", lambda: calls.append(1)
+        )
+    assert handled == []
+    assert calls == []
+    assert not is_event_processed(pending, "e1", "ver1", "SUCCESS")
+
+
+def test_lock_is_released_after_handling(pending, handled):
+    process_enrichment_event(pending, None, "v1", "e1", "ver1", "SUCCESS")
+
+    assert acquire_enrichment_lock(pending, "e1")
+
+
+def test_stale_lock_is_taken_over(pending, handled):
+    acquire_enrichment_lock(pending, "e1")
+    pending.execute(
+        "UPDATE enrichment_locks SET locked_at = ?",
+        (format_datetime(datetime.now() - ENRICHMENT_LOCK_TIMEOUT * 2),),
+    )
+
+    assert process_enrichment_event(pending, None, "v1", "e1", "ver1", "SUCCESS")
+    assert handled == [("v1", "e1", "ver1", "SUCCESS")]
+
+
+def test_event_processed_while_waiting_for_the_lock(pending, handled, monkeypatch):
+    def before_handle():
+        raise AssertionError("handled twice")
+
+    lock = enrichment.enrichment_lock
+
+    @contextmanager
+    def enrichment_lock(conn, enrichment_id):
+        # Another handler finishes just before the lock is acquired
+        mark_event_processed(conn, enrichment_id, "ver1", "SUCCESS")
+        with lock(conn, enrichment_id):
+            yield
+
+    monkeypatch.setattr(enrichment, "enrichment_lock", enrichment_lock)
+
+    assert not process_enrichment_event(
+        pending, None, "v1", "e1", "ver1", "SUCCESS", before_handle
+    )
+    assert handled == []
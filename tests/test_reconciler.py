@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import reconciler
+from core.database import (
+    add_line,
+    format_datetime,
+    get_next_queued_video,
+    get_overdue_requests,
+    mark_request_sent,
+)
+from core.reconciler import reconcile_request
+
+
+@pytest.fixture
+def overdue(conn):
+    add_line(conn, "v1", "e1", "fr", "name", "c1", 600)
+    conn.execute(
+        "UPDATE enrichment_requests SET request_sent_at = ?, reconcile_attempts = 2",
+        (format_datetime(datetime.now() - timedelta(hours=1)),),
+    )
+    return get_overdue_requests(conn, datetime.now(), 10)[0]
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        reconciler,
+        "get_latest_enrichment_version",
+        lambda enrichment_id: {"id": "ver2"},
+    )
+    monkeypatch.setattr(
+        reconciler,
+        "process_enrichment_event",
+        lambda conn, msc, oid, enrichment_id, version_id, status: events.append(
+            (oid, enrichment_id, version_id, status)
+        ),
+    )
+    return events
+
+
+def get_check(conn, oid):
+    return conn.execute(
+        "SELECT reconcile_attempts, next_check_at FROM enrichment_requests WHERE oid = ?",
+        (oid,),
+    ).fetchone()
+
+
+def test_processing_enrichment_is_checked_later(conn, overdue):
+    before = datetime.now().replace(microsecond=0)
+    reconcile_request(conn, None, overdue, {"status": "PENDING"})
+
+    attempts, next_check_at = get_check(conn, "v1")
+    assert attempts == 3
+    assert datetime.fromisoformat(next_check_at) >= (
+        before + reconciler.RECONCILE_BASE_DELAY * 4
+    )
+
+
+def test_missed_webhook_is_handled(conn, overdue, handled):
+    reconcile_request(conn, None, overdue, {"status": "SUCCESS"})
+
+    assert handled == [("v1", "e1", "ver2", "SUCCESS")]
+    assert get_check(conn, "v1")[0] == 3
+
+
+def test_new_request_is_not_postponed(conn, overdue, handled, monkeypatch):
+    # Handling the enrichment requests its translation
+    monkeypatch.setattr(
+        reconciler,
+        "process_enrichment_event",
+        lambda conn, msc, oid, *args: mark_request_sent(conn, oid),
+    )
+
+    reconcile_request(conn, None, overdue, {"status": "SUCCESS"})
+
+    assert get_check(conn, "v1") == (0, None)
+
+
+def test_failed_enrichment_is_resubmitted(conn, overdue, monkeypatch):
+    monkeypatch.setattr(reconciler, "get_enrichment_language", lambda oid: "fr")
+    monkeypatch.setattr(reconciler, "get_channel_priority", lambda oid: 0)
+
+    reconcile_request(conn, None, overdue, {"status": "FAILURE"})
+
+    assert get_next_queued_video(conn)["oid"] == "v1"
+    assert get_check(conn, "v1")[0] == 3
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from core.database import add_line, update_status_by_oid
+from core.status import get_status_summary, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [15, 20, 35, 40, 50]
+    assert percentile(values, 5) == 15
+    assert percentile(values, 30) == 20
+    assert percentile(values, 40) == 20
+    assert percentile(values, 50) == 35
+    assert percentile(values, 100) == 50
+
+
+def test_percentile_unsorted_values():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([7], 99) == 7
+
+
+def test_status_summary(conn):
+    add_line(conn, "v1", "e1", "fr", "one", "c1")
+    add_line(conn, "v2", "e2", "fr", "two", "c1")
+    add_line(conn, "v3", "e3", "en", "three", "c2")
+    update_status_by_oid(conn, "v1", "SUCCESS")
+
+    summary = get_status_summary(conn)
+
+    assert summary["total"] == 3
+    assert summary["by_status"] == {"PENDING": 2, "SUCCESS": 1}
+    assert summary["by_channel"] == {
+        "c1": {"PENDING": 1, "SUCCESS": 1},
+        "c2": {"PENDING": 1},
+    }
+    assert summary["backlog"]["count"] == 2
+
+
+def test_status_summary_cache(conn):
+    add_line(conn, "v1", "e1", "fr", "one", "c1")
+    get_status_summary(conn)
+
+    add_line(conn, "v2", "e2", "fr", "two", "c1")
+    assert get_status_summary(conn, ttl=timedelta(minutes=1))["total"] == 1
+    assert get_status_summary(conn)["total"] == 2
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import stuck
+from core.database import (
+    add_line,
+    format_datetime,
+    mark_request_sent,
+    update_enrichment_notification_received_at,
+    update_status_by_oid,
+)
+from core.stuck import (
+    DEFAULT_STUCK_TIMEOUT,
+    MIN_STUCK_TIMEOUT,
+    STUCK_TIMEOUT_MIN_SAMPLES,
+    estimate_stuck_timeouts,
+    is_stuck,
+    resolve_stuck_timeout,
+)
+
+
+def timeout_stats(minutes):
+    return {"timeout": timedelta(minutes=minutes) if minutes else None}
+
+
+def test_resolve_stuck_timeout_from_bucket():
+    estimates = {"all": timeout_stats(60), 900: timeout_stats(40)}
+    assert resolve_stuck_timeout(estimates, 900) == timedelta(minutes=40)
+
+
+def test_resolve_stuck_timeout_falls_back_on_all_durations():
+    estimates = {"all": timeout_stats(60), 900: timeout_stats(None)}
+    assert resolve_stuck_timeout(estimates, 900) == timedelta(minutes=60)
+    assert resolve_stuck_timeout(estimates, "all") == timedelta(minutes=60)
+
+
+def test_resolve_stuck_timeout_falls_back_on_default():
+    estimates = {"all": timeout_stats(None), 900: timeout_stats(None)}
+    assert resolve_stuck_timeout(estimates, 900) == DEFAULT_STUCK_TIMEOUT
+
+
+def send(conn, oid, minutes_ago, media_duration=600):
+    add_line(conn, oid, f"e-{oid}", "fr", "name", "c1", media_duration)
+    conn.execute(
+        "UPDATE enrichment_requests SET request_sent_at = ? WHERE oid = ?",
+        (format_datetime(datetime.now() - timedelta(minutes=minutes_ago)), oid),
+    )
+
+
+def get_processing_time(conn, oid):
+    return conn.execute(
+        "SELECT processing_time FROM enrichment_requests WHERE oid = ?", (oid,)
+    ).fetchone()[0]
+
+
+def test_processing_time_is_measured_on_first_notification(conn):
+    send(conn, "v1", 60)
+    update_enrichment_notification_received_at(conn, "e-v1")
+    assert 3590 <= get_processing_time(conn, "v1") <= 3610
+
+    # A translation is requested, then notified
+    mark_request_sent(conn, "v1")
+    update_enrichment_notification_received_at(conn, "e-v1")
+    assert 3590 <= get_processing_time(conn, "v1") <= 3610
+
+
+def test_stuck_timeouts_are_learned_per_duration(conn):
+    for index in range(STUCK_TIMEOUT_MIN_SAMPLES):
+        send(conn, f"short{index}", 10, media_duration=600)
+        send(conn, f"long{index}", 120, media_duration=6000)
+    for oid in [row[0] for row in conn.execute("SELECT oid FROM enrichment_requests")]:
+        update_enrichment_notification_received_at(conn, f"e-{oid}")
+        update_status_by_oid(conn, oid, "SUCCESS")
+
+    estimates = estimate_stuck_timeouts(conn)
+
+    assert estimates["all"]["samples"] == 2 * STUCK_TIMEOUT_MIN_SAMPLES
+    assert estimates[900]["timeout"] == MIN_STUCK_TIMEOUT
+    assert (
+        timedelta(minutes=235) <= estimates[None]["timeout"] <= timedelta(minutes=245)
+    )
+    assert estimates[2700]["timeout"] is None
+
+
+@pytest.fixture
+def default_timeout(monkeypatch):
+    monkeypatch.setattr(
+        stuck, "stuck_timeouts_cache", {"estimates": None, "computed_at": None}
+    )
+
+
+@pytest.mark.parametrize(
+    "status, minutes_ago, expected",
+    [
+        ("FAILURE", 1, True),
+        ("UPLOADING_MEDIA", 1, False),
+        ("UPLOADING_MEDIA", DEFAULT_STUCK_TIMEOUT.total_seconds() / 60 + 1, True),
+        ("TRANSCRIBING", DEFAULT_STUCK_TIMEOUT.total_seconds() / 60 + 1, False),
+    ],
+)
+def test_is_stuck(conn, default_timeout, status, minutes_ago, expected):
+    request_sent_at = format_datetime(datetime.now() - timedelta(minutes=minutes_ago))
+    assert is_stuck(conn, {"status": status}, request_sent_at, 600) is expected
+
+
+def test_is_stuck_without_request_date(conn, default_timeout):
+    assert is_stuck(conn, {"status": "UPLOADING_MEDIA"}, None)
@@ -0,0 +1,393 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from core import submissions
+from core.circuit_breaker import CircuitOpenError
+from core.database import (
+    QUEUE_CLAIM_TIMEOUT,
+    add_line,
+    boost_queued_video,
+    claim_queued_video,
+    count_queued_videos,
+    dequeue_video,
+    enqueue_video,
+    format_datetime,
+    get_enrichment_id_by_oid,
+    get_next_queued_video,
+    get_status_by_oid,
+    mark_request_sent,
+    oid_exists,
+    update_status_by_oid,
+)
+from core.submissions import (
+    BACKFILL_PRIORITY,
+    FRESH_CONTENT_PRIORITY,
+    IN_FLIGHT_MAX_AGE,
+    SUBMISSION_BASE_DELAY,
+    SUBMISSION_MAX_ATTEMPTS,
+    SUBMISSION_MAX_DELAY,
+    compute_priority,
+    drain_queue,
+    has_submission_slot,
+    in_time_window,
+    parse_time_window,
+    record_submission_failure,
+    submit_video,
+)
+
+
+def test_parse_time_window():
+    assert parse_time_window("22:00-06:30") == (time(22, 0), time(6, 30))
+    assert parse_time_window(" 08:00 - 18:00 ") == (time(8, 0), time(18, 0))
+
+
+def sent(conn, oid, hours_ago):
+    add_line(conn, oid, f"e-{oid}", "fr", "name", "c1")
+    conn.execute(
+        "UPDATE enrichment_requests SET request_sent_at = ? WHERE oid = ?",
+        (format_datetime(datetime.now() - timedelta(hours=hours_ago)), oid),
+    )
+
+
+def test_has_submission_slot_counts_enrichments_in_flight(conn):
+    sent(conn, "v1", 1)
+    sent(conn, "v2", 2)
+    update_status_by_oid(conn, "v2", "TRANSCRIBED")
+
+    assert has_submission_slot(conn, max_in_flight=3)
+    assert not has_submission_slot(conn, max_in_flight=2)
+    assert has_submission_slot(conn)
+
+
+def test_has_submission_slot_ignores_completed_and_lost_requests(conn):
+    sent(conn, "v1", 1)
+    update_status_by_oid(conn, "v1", "SUCCESS")
+    sent(conn, "v2", 1)
+    update_status_by_oid(conn, "v2", "FAILURE")
+    sent(conn, "v3", IN_FLIGHT_MAX_AGE.total_seconds() / 3600 + 1)
+
+    assert has_submission_slot(conn, max_in_flight=1)
+
+
+def test_has_submission_slot_counts_new_requests_on_enrichments(conn):
+    # A translation or quiz requested for an old enrichment
+    sent(conn, "v1", IN_FLIGHT_MAX_AGE.total_seconds() / 3600 + 1)
+    update_status_by_oid(conn, "v1", "PENDING")
+    mark_request_sent(conn, "v1")
+
+    assert not has_submission_slot(conn, max_in_flight=1)
+
+
+def test_has_submission_slot_outside_window(conn):
+    now = datetime.now()
+    closed = (
+        (now + timedelta(hours=1)).time(),
+        (now + timedelta(hours=2)).time(),
+    )
+    assert not has_submission_slot(conn, window=closed)
+
+
+@pytest.mark.parametrize(
+    "window, hour, expected",
+    [
+        ("08:00-18:00", 8, True),
+        ("08:00-18:00", 12, True),
+        ("08:00-18:00", 18, False),
+        ("08:00-18:00", 7, False),
+        ("22:00-06:00", 23, True),
+        ("22:00-06:00", 3, True),
+        ("22:00-06:00", 6, False),
+        ("22:00-06:00", 12, False),
+    ],
+)
+def test_in_time_window(window, hour, expected):
+    now = datetime(2024, 1, 1, hour, 0)
+    assert in_time_window(parse_time_window(window), now) is expected
+
+
+def test_compute_priority_fresh_content():
+    published_at = (datetime.now() - timedelta(days=1)).isoformat()
+    assert compute_priority(published_at, 5, backfill=True) == (
+        5 + FRESH_CONTENT_PRIORITY
+    )
+
+
+def test_compute_priority_timezone_aware_date():
+    published_at = (datetime.now() - timedelta(days=1)).isoformat() + "+00:00"
+    assert compute_priority(published_at, 0, backfill=False) == FRESH_CONTENT_PRIORITY
+
+
+def test_compute_priority_old_content():
+    published_at = (datetime.now() - timedelta(days=30)).isoformat()
+    assert compute_priority(published_at, 5, backfill=False) == 5
+    assert compute_priority(published_at, 5, backfill=True) == 5 + BACKFILL_PRIORITY
+
+
+def test_compute_priority_unknown_date():
+    assert compute_priority(None, 3, backfill=False) == 3
+    assert compute_priority("not a date", 3, backfill=True) == 3 + BACKFILL_PRIORITY
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    # So that delays can be checked
+    monkeypatch.setattr(submissions.random, "uniform", lambda low, high: high)
+
+
+def queued_video(conn, oid, attempts):
+    enqueue_video(conn, oid, "c1", "name", "fr", 0, None, 600)
+    return {
+        "oid": oid,
+        "parent_oid": "c1",
+        "name": "name",
+        "language": "fr",
+        "media_duration": 600,
+        "attempts": attempts,
+    }
+
+
+def get_retry(conn, oid):
+    return conn.execute(
+        "SELECT attempts, next_attempt_at, last_error FROM enrichment_queue WHERE oid = ?",
+        (oid,),
+    ).fetchone()
+
+
+@pytest.mark.parametrize("attempts", [0, 1, 3])
+def test_record_submission_failure_backoff(conn, no_jitter, attempts):
+    video = queued_video(conn, "v1", attempts)
+
+    before = datetime.now().replace(microsecond=0)
+    record_submission_failure(conn, video, "refused")
+    after = datetime.now()
+
+    saved_attempts, next_attempt_at, last_error = get_retry(conn, "v1")
+    delay = SUBMISSION_BASE_DELAY * 2**attempts
+    assert saved_attempts == attempts + 1
+    assert before + delay <= datetime.fromisoformat(next_attempt_at) <= after + delay
+    assert last_error == "refused"
+
+
+def test_record_submission_failure_backoff_is_capped(conn, no_jitter):
+    video = queued_video(conn, "v1", SUBMISSION_MAX_ATTEMPTS - 2)
+
+    before = datetime.now().replace(microsecond=0)
+    record_submission_failure(conn, video, "refused")
+
+    _, next_attempt_at, _ = get_retry(conn, "v1")
+    assert datetime.fromisoformat(next_attempt_at) <= (
+        datetime.now() + SUBMISSION_MAX_DELAY
+    )
+    assert datetime.fromisoformat(next_attempt_at) >= before + SUBMISSION_MAX_DELAY
+
+
+def test_record_submission_failure_gives_up_on_new_video(conn):
+    video = queued_video(conn, "v1", SUBMISSION_MAX_ATTEMPTS - 1)
+
+    record_submission_failure(conn, video, "refused")
+
+    assert get_retry(conn, "v1") is None
+    assert get_status_by_oid(conn, "v1") == "SUBMISSION_FAILED"
+
+
+def test_record_submission_failure_gives_up_on_stuck_video(conn):
+    add_line(conn, "v1", "e1", "fr", "name", "c1")
+    update_status_by_oid(conn, "v1", "FAILURE")
+    video = queued_video(conn, "v1", SUBMISSION_MAX_ATTEMPTS - 1)
+
+    record_submission_failure(conn, video, "refused")
+
+    assert get_retry(conn, "v1") is None
+    assert get_status_by_oid(conn, "v1") == "SUBMISSION_FAILED"
+
+
+def test_record_submission_failure_keeps_successful_enrichment(conn):
+    add_line(conn, "v1", "e1", "fr", "name", "c1")
+    update_status_by_oid(conn, "v1", "SUCCESS")
+    video = queued_video(conn, "v1", SUBMISSION_MAX_ATTEMPTS - 1)
+
+    record_submission_failure(conn, video, "refused")
+
+    assert get_retry(conn, "v1") is None
+    assert oid_exists(conn, "v1")
+    assert get_status_by_oid(conn, "v1") == "SUCCESS"
+
+
+def test_drain_queue_does_not_wait_on_empty_queue(conn, monkeypatch):
+    def sleep(seconds):
+        raise AssertionError("waited for a slot")
+
+    monkeypatch.setattr(submissions.time, "sleep", sleep)
+
+    assert drain_queue(conn, max_in_flight=0, wait=True) == 0
+
+
+@pytest.fixture
+def aristote(monkeypatch):
+    submitted = []
+
+    def request_enrichment(oid, language=None):
+        submitted.append(oid)
+        return f"enrichment-{oid}"
+
+    monkeypatch.setattr(submissions, "request_enrichment", request_enrichment)
+    return submitted
+
+
+def closed_window():
+    now = datetime.now()
+    start, end = now + timedelta(hours=1), now + timedelta(hours=2)
+    return f"{start:%H:%M}-{end:%H:%M}"
+
+
+def test_drain_queue_throttles_each_video_with_its_own_constraints(
+    conn, aristote, monkeypatch
+):
+    def sleep(seconds):
+        raise AssertionError("waited for a slot")
+
+    monkeypatch.setattr(submissions.time, "sleep", sleep)
+    # Backfill queued by a throttled run, then fresh content by a plain one
+    enqueue_video(
+        conn, "backfill", "c1", "name", "fr", -1000, None, 600, closed_window()
+    )
+    enqueue_video(conn, "fresh", "c1", "name", "fr", 1000, None, 600)
+
+    assert drain_queue(conn) == 1
+    assert aristote == ["fresh"]
+    assert get_next_queued_video(conn)["oid"] == "backfill"
+
+
+def test_drain_queue_waits_for_videos_queued_with_its_constraints(
+    conn, aristote, monkeypatch
+):
+    window = closed_window()
+    enqueue_video(conn, "backfill", "c1", "name", "fr", -1000, None, 600, window)
+
+    def sleep(seconds):
+        # The window opens
+        enqueue_video(conn, "backfill", "c1", "name", "fr", -1000, None, 600)
+
+    monkeypatch.setattr(submissions.time, "sleep", sleep)
+
+    assert drain_queue(conn, window=parse_time_window(window)) == 1
+    assert aristote == ["backfill"]
+
+
+def test_claimed_video_is_not_submitted_twice(conn, aristote):
+    enqueue_video(conn, "v1", "c1", "name", "fr", 0, None, 600)
+
+    assert claim_queued_video(conn, "v1")
+    assert not claim_queued_video(conn, "v1")
+    assert drain_queue(conn, wait=False) == 0
+    assert aristote == []
+
+
+def test_stale_claim_is_taken_over(conn, aristote):
+    enqueue_video(conn, "v1", "c1", "name", "fr", 0, None, 600)
+    conn.execute(
+        "UPDATE enrichment_queue SET claimed_at = ?",
+        (format_datetime(datetime.now() - QUEUE_CLAIM_TIMEOUT * 2),),
+    )
+
+    assert drain_queue(conn, wait=False) == 1
+    assert aristote == ["v1"]
+    assert oid_exists(conn, "v1")
+
+
+def test_queue_order(conn):
+    old = (datetime.now() - timedelta(days=30)).isoformat()
+    recent = (datetime.now() - timedelta(days=20)).isoformat()
+    enqueue_video(conn, "backfill", "c1", "name", "fr", -1000, recent, 600)
+    enqueue_video(conn, "old", "c1", "name", "fr", 0, old, 600)
+    enqueue_video(conn, "recent", "c1", "name", "fr", 0, recent, 600)
+    enqueue_video(conn, "fresh", "c1", "name", "fr", 1000, None, 600)
+
+    order = []
+    while video := get_next_queued_video(conn):
+        order.append(video["oid"])
+        dequeue_video(conn, video["oid"])
+    assert order == ["fresh", "recent", "old", "backfill"]
+
+
+def test_boosted_video_goes_first(conn):
+    enqueue_video(conn, "v1", "c1", "name", "fr", 1000, None, 600)
+    enqueue_video(conn, "v2", "c1", "name", "fr", -1000, None, 600)
+
+    assert boost_queued_video(conn, "v2", 5000)
+    assert not boost_queued_video(conn, "unknown", 5000)
+    assert get_next_queued_video(conn)["oid"] == "v2"
+
+
+def test_drain_queue_submits_by_priority_up_to_limit(conn, aristote):
+    enqueue_video(conn, "v1", "c1", "name", "fr", 0, None, 600)
+    enqueue_video(conn, "v2", "c1", "name", "fr", 10, None, 600)
+    enqueue_video(conn, "v3", "c1", "name", "fr", 5, None, 600)
+
+    assert drain_queue(conn, limit=2) == 2
+    assert aristote == ["v2", "v3"]
+    assert count_queued_videos(conn) == 1
+    assert get_enrichment_id_by_oid(conn, "v2") == "enrichment-v2"
+    assert get_status_by_oid(conn, "v2") == "PENDING"
+
+
+def test_submit_video_replaces_previous_request(conn, aristote):
+    add_line(conn, "v1", "e1", "fr", "name", "c1")
+    update_status_by_oid(conn, "v1", "FAILURE")
+    video = queued_video(conn, "v1", 0)
+
+    assert submit_video(conn, video)
+    assert get_enrichment_id_by_oid(conn, "v1") == "enrichment-v1"
+    assert get_status_by_oid(conn, "v1") == "PENDING"
+    assert count_queued_videos(conn) == 0
+
+
+def test_refused_submission_is_retried_later(conn, no_jitter, monkeypatch):
+    monkeypatch.setattr(submissions, "request_enrichment", lambda oid, language: None)
+    enqueue_video(conn, "v1", "c1", "name", "fr", 0, None, 600)
+
+    assert drain_queue(conn, wait=False) == 0
+
+    attempts, next_attempt_at, last_error = get_retry(conn, "v1")
+    assert attempts == 1
+    assert datetime.fromisoformat(next_attempt_at) > datetime.now()
+    assert last_error == "Enrichment request refused by Aristote"
+    assert not oid_exists(conn, "v1")
+    # Not due yet, and no longer claimed
+    assert get_next_queued_video(conn) is None
+    conn.execute("UPDATE enrichment_queue SET next_attempt_at = NULL")
+    assert get_next_queued_video(conn)["oid"] == "v1"
+
+
+def test_failed_submission_records_the_error(conn, no_jitter, monkeypatch):
+    def request_enrichment(oid, language=None):
+        raise Exception("Connection refused")
+
+    monkeypatch.setattr(submissions, "request_enrichment", request_enrichment)
+    video = queued_video(conn, "v1", 0)
+
+    assert not submit_video(conn, video)
+    assert get_retry(conn, "v1")[2] == "Connection refused"
+
+
+def test_open_circuit_keeps_video_queued(conn, monkeypatch):
+    calls = []
+
+    def request_enrichment(oid, language=None):
+        calls.append(oid)
+        if len(calls) == 1:
+            raise CircuitOpenError("aristote", 30)
+        return "e1"
+
+    pauses = []
+    monkeypatch.setattr(submissions, "request_enrichment", request_enrichment)
+    monkeypatch.setattr(
+        submissions, "pause_on_open_circuit", lambda error: pauses.append(error)
+    )
+    enqueue_video(conn, "v1", "c1", "name", "fr", 0, None, 600)
+
+    assert drain_queue(conn, wait=False) == 1
+    assert calls == ["v1", "v1"]
+    assert len(pauses) == 1
+    assert get_enrichment_id_by_oid(conn, "v1") == "e1"
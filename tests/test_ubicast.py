@@ -0,0 +1,179 @@
+import base64
+from contextlib import closing
+import sqlite3
+
+import pytest
+
+import ubicast
+from core import enrichment, status
+from core.circuit_breaker import CircuitOpenError
+from core.database import (
+    acquire_enrichment_lock,
+    add_line,
+    initiate_database,
+    is_event_processed,
+    mark_event_processed,
+)
+
+
+class FakeNudgis:
+    checks = 0
+    unavailable = False
+
+    def __init__(self, config_file):
+        self.conf = {}
+
+    def check_server(self):
+        if FakeNudgis.unavailable:
+            raise CircuitOpenError("nudgis", 42)
+        FakeNudgis.checks += 1
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = str(tmp_path / "aristote.db")
+    monkeypatch.setattr(ubicast, "DATABASE_URL", path)
+    with closing(sqlite3.connect(path)) as conn:
+        initiate_database(conn)
+        add_line(conn, "v1", "e1", "fr", "name", "c1")
+    return path
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    FakeNudgis.checks = 0
+    FakeNudgis.unavailable = False
+    monkeypatch.setattr(ubicast, "NudgisClient", FakeNudgis)
+    return ubicast.app.test_client()
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        enrichment,
+        "handle_enrichment",
+        lambda conn, msc, oid, enrichment_id, version_id, status: events.append(
+            (oid, enrichment_id, version_id, status)
+        ),
+    )
+    return events
+
+
+def notify(client, status="SUCCESS"):
+    return client.post(
+        "/webhook", json={"id": "e1", "status": status, "initialVersionId": "ver1"}
+    )
+
+
+def test_webhook_handles_new_event(client, database, handled):
+    response = notify(client)
+
+    assert response.status_code == 200
+    assert handled == [("v1", "e1", "ver1", "SUCCESS")]
+    assert FakeNudgis.checks == 1
+    with closing(sqlite3.connect(database)) as conn:
+        assert is_event_processed(conn, "e1", "ver1", "SUCCESS")
+        notified_at = conn.execute(
+            "SELECT enrichment_notification_received_at FROM enrichment_requests"
+        ).fetchone()[0]
+    assert notified_at is not None
+
+
+def test_webhook_ignores_duplicate_event(client, database, handled):
+    with closing(sqlite3.connect(database)) as conn:
+        mark_event_processed(conn, "e1", "ver1", "SUCCESS")
+
+    response = notify(client)
+
+    assert response.status_code == 200
+    assert handled == []
+    assert FakeNudgis.checks == 0
+
+
+def test_webhook_asks_to_retry_locked_event(client, database, handled):
+    with closing(sqlite3.connect(database)) as conn:
+        acquire_enrichment_lock(conn, "e1")
+
+    response = notify(client)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        enrichment.ENRICHMENT_LOCK_RETRY_AFTER
+    )
+    assert handled == []
+    assert FakeNudgis.checks == 0
+    with closing(sqlite3.connect(database)) as conn:
+        assert not is_event_processed(conn, "e1", "ver1", "SUCCESS")
+
+
+def test_webhook_releases_lock_on_failure(client, database, monkeypatch):
+    def handle_enrichment(*args):
+        raise Exception("Translation refused by Aristote")
+
+    monkeypatch.setattr(enrichment, "handle_enrichment", handle_enrichment)
+
+    assert notify(client).status_code == 500
+    with closing(sqlite3.connect(database)) as conn:
+        assert not is_event_processed(conn, "e1", "ver1", "SUCCESS")
+        assert acquire_enrichment_lock(conn, "e1")
+
+
+def test_webhook_asks_to_retry_when_nudgis_is_unavailable(client, database, handled):
+    FakeNudgis.unavailable = True
+
+    response = notify(client)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "42"
+    assert handled == []
+    with closing(sqlite3.connect(database)) as conn:
+        assert not is_event_processed(conn, "e1", "ver1", "SUCCESS")
+        assert acquire_enrichment_lock(conn, "e1")
+
+
+def test_export_when_nudgis_is_unavailable(client):
+    FakeNudgis.unavailable = True
+
+    response = client.get("/export/v1234567890abcdefghi")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "42"
+
+
+def test_metrics(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'circuit_breaker_state{name="aristote"}' in response.text
+    assert 'circuit_breaker_state{name="nudgis"}' in response.text
+
+
+@pytest.fixture
+def credentials(monkeypatch):
+    monkeypatch.setattr(status, "status_cache", {"summary": None, "computed_at": None})
+    token = base64.b64encode(
+        f"{ubicast.CSV_ENPOINT_USER}:{ubicast.CSV_ENPOINT_PASSWORD}".encode()
+    ).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def test_status_requires_authentication(client):
+    assert client.get("/status").status_code == 401
+
+
+def test_status(client, database, credentials):
+    response = client.get("/status", headers=credentials)
+
+    assert response.status_code == 200
+    assert response.json["total"] == 1
+    assert response.json["by_status"] == {"PENDING": 1}
+    assert response.json["backlog"]["count"] == 1
+
+
+def test_status_is_cached(client, database, credentials):
+    client.get("/status", headers=credentials)
+    with closing(sqlite3.connect(database)) as conn:
+        add_line(conn, "v2", "e2", "fr", "name", "c1")
+
+    assert client.get("/status", headers=credentials).json["total"] == 1
@@ -1,17 +1,40 @@
+from contextlib import closing
 import csv
-from datetime import datetime
+from datetime import timedelta
 import re
 import sqlite3
 import uuid
 import requests
-from flask import Flask, request, Response, stream_with_context, redirect
+from flask import (
+    Flask,
+    request,
+    Response,
+    stream_with_context,
+    redirect,
+    jsonify,
+)
 from flask_httpauth import HTTPBasicAuth
-from ms_client.client import MediaServerClient, MediaServerRequestError
+from ms_client.client import MediaServerRequestError
 from urllib.parse import urlparse
 import logging
 import os
 from dotenv import load_dotenv
-from aristote import get_enrichment_version, get_transcript, request_new_enrichment
+from core.aristote import aristote_breaker
+from core.circuit_breaker import CircuitOpenError, format_metrics
+from core.database import (
+    get_enrichment_id_by_oid,
+    get_successful_requests,
+    initiate_database,
+    update_enrichment_notification_received_at,
+    update_status_by_oid,
+)
+from core.enrichment import (
+    EnrichmentLockedError,
+    get_media_best_resource_url,
+    process_enrichment_event,
+)
+from core.nudgis import NudgisClient, nudgis_breaker
+from core.status import get_status_summary
 
 logger = logging.getLogger(__name__)
 load_dotenv(".env")
@@ -22,24 +45,12 @@ CONFIG_FILE = os.environ["CONFIG_FILE"]
 ARISTOTE_PORTAL_BASE_URL = os.environ["ARISTOTE_PORTAL_BASE_URL"]
 CSV_ENPOINT_USER = os.environ["CSV_ENPOINT_USER"]
 CSV_ENPOINT_PASSWORD = os.environ["CSV_ENPOINT_PASSWORD"]
-
-ARISTOTE_MARKER = "aristote_generated"
+STATUS_CACHE_TTL = timedelta(seconds=10)
 
 app = Flask(__name__)
 
-
-def get_oid_by_enrichment_id(
-    conn: sqlite3.Connection, enrichment_id: str
-) -> str | None:
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT oid FROM enrichment_requests WHERE enrichment_id = ?", (enrichment_id,)
-    )
-    row = cursor.fetchone()
-
-    if row:
-        return row[0]
-    return None
+with closing(sqlite3.connect(DATABASE_URL)) as conn:
+    initiate_database(conn)
 
 
 def is_valid_uuid(val: str):
@@ -55,219 +66,63 @@ def is_valid_oid(val):
     return bool(re.match(pattern, val))
 
 
-def get_enrichment_id_by_oid(conn: sqlite3.Connection, oid: str) -> str | None:
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT enrichment_id FROM enrichment_requests WHERE oid = ?", (oid,)
+@app.errorhandler(CircuitOpenError)
+def circuit_open_response(error: CircuitOpenError):
+    return Response(
+        str(error),
+        status=503,
+        headers={"Retry-After": str(max(1, round(error.retry_after)))},
     )
-    row = cursor.fetchone()
 
-    if row:
-        return row[0]
-    return None
 
-
-def get_successful_requests(conn: sqlite3.Connection):
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT * FROM enrichment_requests
-        WHERE status = 'SUCCESS'
-        """
+@app.errorhandler(EnrichmentLockedError)
+def enrichment_locked_response(error: EnrichmentLockedError):
+    # Delivered again by Aristote in case the current handler fails
+    logger.info(str(error))
+    return Response(
+        str(error),
+        status=503,
+        headers={"Retry-After": str(error.retry_after)},
     )
 
-    rows = cursor.fetchall()
-    result = [dict(row) for row in rows]
 
-    return result
-
-
-def update_status_by_oid(conn: sqlite3.Connection, oid: str, status: str):
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        UPDATE enrichment_requests
-        SET status = ?
-        WHERE oid = ?
-    """,
-        (status, oid),
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(
+        format_metrics([aristote_breaker, nudgis_breaker]), content_type="text/plain"
     )
-    conn.commit()
 
 
-def update_enrichment_notification_received_at(
-    conn: sqlite3.Connection, enrichment_id: str
-):
-    cursor = conn.cursor()
-
-    enrichment_notification_received_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    cursor.execute(
-        """
-        UPDATE enrichment_requests
-        SET enrichment_notification_received_at = ?
-        WHERE enrichment_id = ?
-    """,
-        (enrichment_notification_received_at, enrichment_id),
-    )
-    conn.commit()
-
-
-def update_language_by_oid(conn: sqlite3.Connection, oid: str, language: str):
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        UPDATE enrichment_requests
-        SET language = ?
-        WHERE oid = ?
-    """,
-        (language, oid),
-    )
-    conn.commit()
-
-
-def get_media_best_resource_url(msc: MediaServerClient, oid) -> str:
-    resources = msc.api("medias/resources-list/", params=dict(oid=oid))["resources"]
-    resources.sort(key=lambda a: a["file_size"])
-    if not resources:
-        logger.debug("Media has no resources.")
-        return
-    best_quality = None
-    for r in resources:
-        if r["format"] != "m3u8":
-            best_quality = r
-            break
-    if not best_quality:
-        logger.warning("No resource file can be downloaded for video %s!" % (oid,))
-        logger.warning("Resources: %s" % resources)
-        raise Exception("Could not download any resource from list: %s." % resources)
-
-    logger.debug("Smallest file for video %s: %s" % (oid, best_quality["file"]))
-
-    if best_quality["format"] not in ("youtube", "embed"):
-        url_resource = msc.api(
-            "download/",
-            method="get",
-            params=dict(oid=oid, url=best_quality["file"], redirect="no"),
-        )["url"]
-        return url_resource
-    else:
-        return None
-
-
-def handle_enrichment(
-    conn: sqlite3.Connection,
-    msc: MediaServerClient,
-    oid: str,
-    enrichment_id: str,
-    enrichment_version_id: str,
-    status,
-):
-    if status == "SUCCESS":
-        if oid:
-            enrichment_version = get_enrichment_version(
-                enrichment_id, enrichment_version_id
-            )
-            language = enrichment_version["transcript"]["language"]
-            translate_to = enrichment_version["translateTo"]
-
-            if translate_to:
-                logger.debug(f"Enrichment translated to {translate_to}")
-                update_status_by_oid(conn=conn, oid=oid, status="SUCCESS")
-            else:
-                logger.debug("Requesting enrichment translation")
-                if language is not None and language != "":
-                    update_status_by_oid(conn=conn, oid=oid, status="TRANSCRIBED")
-                    update_language_by_oid(conn=conn, oid=oid, language=language)
-                    request_new_enrichment(enrichment_id, language)
-                else:
-                    update_status_by_oid(
-                        conn=conn, oid=oid, status="TRANSCRIBED_NO_LANGUAGE"
-                    )
-                return
-            transcript = get_transcript(enrichment_id, enrichment_version_id, language)
-            subtitles_get_response = msc.api(
-                "/subtitles", method="get", params={"oid": oid}
-            )
-
-            subs = subtitles_get_response["subtitles"]
-
-            for sub in subs:
-                if str(sub["title"]).startswith(ARISTOTE_MARKER):
-                    logger.debug("Deleting found Aristote subtitle")
-                    sub_id = sub["id"]
-                    subtitles_delete_response = msc.api(
-                        "/subtitles/delete",
-                        method="post",
-                        data={"id": sub_id},
-                    )
-                    logger.debug(subtitles_delete_response["message"])
-
-            logger.debug(f"Submitting subtitles in {language}")
-            subtitles_add_response = msc.api(
-                "/subtitles/add",
-                method="post",
-                data={
-                    "oid": oid,
-                    "lang": language,
-                    "validated": "yes",
-                    "title": f"{ARISTOTE_MARKER}_{language}",
-                },
-                files={
-                    "file": (
-                        f"{ARISTOTE_MARKER}_{oid}_{language}.srt",
-                        transcript,
-                        "text/plain",
-                    )
-                },
-            )
-            logger.debug(subtitles_add_response["message"])
-
-            if translate_to:
-                translated_transcript = get_transcript(
-                    enrichment_id, enrichment_version_id, translate_to
-                )
-                logger.debug(f"Submitting translated subtitles in {translate_to}")
-                translated_subtitles_add_response = msc.api(
-                    "/subtitles/add",
-                    method="post",
-                    data={
-                        "oid": oid,
-                        "lang": translate_to,
-                        "validated": "yes",
-                        "title": f"{ARISTOTE_MARKER}_{translate_to}",
-                    },
-                    files={
-                        "file": (
-                            f"{ARISTOTE_MARKER}_{oid}_{translate_to}.srt",
-                            translated_transcript,
-                            "text/plain",
-                        )
-                    },
-                )
-                logger.debug(translated_subtitles_add_response["message"])
-        return
-    elif status == "FAILURE":
-        update_status_by_oid(conn=conn, oid=oid, status="FAILURE")
-        return
+@app.route("/status", methods=["GET"])
+@auth.login_required
+def status():
+    with closing(sqlite3.connect(DATABASE_URL)) as conn:
+        summary = get_status_summary(conn, ttl=STATUS_CACHE_TTL)
+    return jsonify(summary)
 
 
 @app.route("/webhook", methods=["POST"])
 def webhook():
-    msc = MediaServerClient(CONFIG_FILE)
-    msc.conf["TIMEOUT"] = 30
-    msc.check_server()
     data = request.get_json()
     enrichment_id = data["id"]
     status = data["status"]
     enrichment_version_id = data["initialVersionId"]
     conn = sqlite3.connect(DATABASE_URL)
-    update_enrichment_notification_received_at(conn=conn, enrichment_id=enrichment_id)
-    oid = get_oid_by_enrichment_id(conn=conn, enrichment_id=enrichment_id)
-    logger.info(f"OID : {oid}")
-    handle_enrichment(conn, msc, oid, enrichment_id, enrichment_version_id, status)
+
+    msc = NudgisClient(CONFIG_FILE)
+    msc.conf["TIMEOUT"] = 30
+
+    def before_handle():
+        msc.check_server()
+        update_enrichment_notification_received_at(
+            conn=conn, enrichment_id=enrichment_id
+        )
+
+    # Answered with 503 by enrichment_locked_response while another handler
+    # processes the enrichment
+    process_enrichment_event(
+        conn, msc, None, enrichment_id, enrichment_version_id, status, before_handle
+    )
     return ""
 
 
@@ -276,10 +131,12 @@ def export_data(oid):
     if not is_valid_oid(oid):
         return Response(f"{oid} is not a valid OID")
 
-    msc = MediaServerClient(CONFIG_FILE)
+    msc = NudgisClient(CONFIG_FILE)
     msc.conf["TIMEOUT"] = 30
     try:
         msc.check_server()
+    except CircuitOpenError as error:
+        return circuit_open_response(error)
     except Exception:
         return Response("Ubicast server timeout", status=504)
 